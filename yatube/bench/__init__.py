@@ -0,0 +1,10 @@
+'''Нагрузочные замеры лент Yatube на сгенерированных данных.
+
+Запуск из папки с manage.py:
+
+    python -m bench --users 1000 --posts 20000 --follows 50000 \
+        --output bench.json
+
+Данные пишутся в отдельную базу SQLite (--database), рабочая база
+проекта не трогается.
+'''
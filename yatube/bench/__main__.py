@@ -0,0 +1,184 @@
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import time
+
+import django
+
+DEFAULT_DATABASE = 'bench.sqlite3'
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m bench',
+        description='Замеры задержек и числа SQL-запросов лент Yatube.')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--follows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1,
+                        help='процессов для генерации данных')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='замеров на каждую страницу')
+    parser.add_argument('--deep-pages', type=int, default=50,
+                        help='глубина страницы главной для замера курсора')
+    parser.add_argument('--warm-cache', action='store_true',
+                        help='не очищать кэш между запросами')
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help='файл SQLite для сгенерированных данных')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='использовать уже заполненную базу')
+    parser.add_argument('--output', help='файл для JSON с результатами')
+    return parser.parse_args(argv)
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(timings, queries):
+    milliseconds = [timing * 1000 for timing in timings]
+    return {
+        'requests': len(timings),
+        'p50_ms': round(percentile(milliseconds, 0.5), 3),
+        'p90_ms': round(percentile(milliseconds, 0.9), 3),
+        'p99_ms': round(percentile(milliseconds, 0.99), 3),
+        'max_ms': round(max(milliseconds), 3),
+        'mean_ms': round(sum(milliseconds) / len(milliseconds), 3),
+        'queries': max(queries),
+    }
+
+
+def measure(client, url, count, warm_cache):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    timings, queries = [], []
+    client.get(url)
+    for _ in range(count):
+        if not warm_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+        queries.append(len(captured))
+    return summarize(timings, queries)
+
+
+def deep_index_url(client, pages):
+    '''Проходит по курсорам главной и возвращает адрес глубокой страницы.'''
+    url = '/'
+    for _ in range(pages):
+        page_obj = client.get(url).context['page_obj']
+        if not page_obj.has_next():
+            break
+        url = f'/?cursor={page_obj.paginator.next_cursor}'
+    return url
+
+
+def targets(deep_pages):
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    reader = User.objects.order_by('-counters__following_count').first()
+    author = User.objects.order_by('-counters__posts_count').first()
+    group = Group.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    post = Post.objects.order_by('-comments_count').first()
+    if None in (reader, author, group, post):
+        raise RuntimeError('В базе нет данных: запустите без --keepdb.')
+    return reader, {
+        'index': reverse('posts:index'),
+        'group_posts': reverse('posts:group_list', args=(group.slug,)),
+        'profile': reverse('posts:profile', args=(author.username,)),
+        'post_detail': reverse('posts:post_detail', args=(post.pk,)),
+        'follow_index': reverse('posts:follow_index'),
+    }
+
+
+def dataset():
+    from django.contrib.auth import get_user_model
+
+    from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+    models = {
+        'users': get_user_model(), 'groups': Group, 'posts': Post,
+        'comments': Comment, 'follows': Follow,
+        'timeline_entries': TimelineEntry,
+    }
+    return {name: model.objects.count() for name, model in models.items()}
+
+
+def run(args):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+
+    settings.DATABASES['default']['TEST'] = {'NAME': args.database}
+    setup_test_environment(debug=False)
+    started = time.perf_counter()
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=args.keepdb)
+    if not args.keepdb:
+        call_command(
+            'seed_yatube', users=args.users, groups=args.groups,
+            posts=args.posts, comments=args.comments, follows=args.follows,
+            seed=args.seed, workers=args.workers, batch_size=5000,
+            stdout=sys.stderr)
+    seed_seconds = time.perf_counter() - started
+
+    reader, urls = targets(args.deep_pages)
+    client = Client()
+    client.force_login(reader)
+    urls['index_deep'] = deep_index_url(client, args.deep_pages)
+
+    results = {
+        name: measure(client, url, args.requests, args.warm_cache)
+        for name, url in urls.items()
+    }
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'database': args.database,
+            'seed': None if args.keepdb else args.seed,
+            'seed_seconds': round(seed_seconds, 3),
+            'warm_cache': args.warm_cache,
+            'dataset': dataset(),
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    django.setup()
+    report = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(report + '\n')
+    print(report)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
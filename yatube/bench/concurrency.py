@@ -0,0 +1,236 @@
+'''Пропускная способность SQLite при одновременном чтении и записи.
+
+Потоки-читатели открывают главную, страницу группы и пост, а
+потоки-писатели в то же время создают посты и комментарии через
+post_create и add_comment. Прогон повторяется на стандартном бэкенде
+Django (журнал отката, обычный BEGIN) и на core.db.sqlite3 с
+SQLITE_PRAGMAS и BEGIN IMMEDIATE:
+
+    python -m bench.concurrency --seconds 10 --readers 4 --writers 2
+
+Кэш страниц на время замера отключён, чтобы каждый запрос шёл в базу.
+
+'''
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+
+import django
+
+from .__main__ import DEFAULT_DATABASE, percentile
+
+STOCK_ENGINE = 'django.db.backends.sqlite3'
+TUNED_ENGINE = 'core.db.sqlite3'
+DUMMY_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='python -m bench.concurrency',
+        description='Чтение и запись в SQLite из нескольких потоков '
+                    'на стандартном бэкенде и на core.db.sqlite3.')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--comments', type=int, default=5000)
+    parser.add_argument('--follows', type=int, default=2000)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--mode', choices=('both', 'default', 'tuned'),
+                        default='both',
+                        help='default — django.db.backends.sqlite3, '
+                             'tuned — core.db.sqlite3')
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help='файл SQLite для сгенерированных данных')
+    parser.add_argument('--keepdb', action='store_true',
+                        help='использовать уже заполненную базу')
+    parser.add_argument('--output', help='файл для JSON с результатами')
+    return parser.parse_args(argv)
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = {'read': [], 'write': []}
+        self.errors = Counter()
+
+    def add(self, kind, seconds):
+        with self.lock:
+            self.timings[kind].append(seconds)
+
+    def fail(self, kind, error):
+        with self.lock:
+            self.errors[f'{kind}: {type(error).__name__}: {error}'] += 1
+
+    def summary(self, seconds):
+        result = {}
+        for kind, timings in self.timings.items():
+            milliseconds = [timing * 1000 for timing in timings] or [0]
+            result[kind] = {
+                'requests': len(timings),
+                'per_second': round(len(timings) / seconds, 1),
+                'p50_ms': round(percentile(milliseconds, 0.5), 3),
+                'p99_ms': round(percentile(milliseconds, 0.99), 3),
+                'max_ms': round(max(milliseconds), 3),
+            }
+        result['errors'] = dict(self.errors)
+        return result
+
+
+def worker(kind, requests, user, seconds, stats, start):
+    '''Вызывает view напрямую: тестовый Client ловит исключения через
+    общий сигнал и путает их между потоками.'''
+    from django.contrib.auth.models import AnonymousUser
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    factory = RequestFactory()
+    start.wait()
+    deadline = time.monotonic() + seconds
+    number = 0
+    try:
+        while time.monotonic() < deadline:
+            method, url, data = requests[number % len(requests)]
+            number += 1
+            request = getattr(factory, method)(url, data)
+            request.user = user or AnonymousUser()
+            match = resolve(url)
+            started = time.perf_counter()
+            try:
+                response = match.func(request, *match.args, **match.kwargs)
+            except Exception as error:
+                stats.fail(kind, error)
+                continue
+            if response.status_code >= 400:
+                stats.fail(kind, f'HTTP {response.status_code}')
+                continue
+            stats.add(kind, time.perf_counter() - started)
+    finally:
+        connection.close()
+
+
+def workload(writers):
+    from django.contrib.auth import get_user_model
+    from django.db.models import Count
+    from django.urls import reverse
+
+    from posts.models import Group, Post
+
+    User = get_user_model()
+    group = Group.objects.annotate(
+        total=Count('posts')).order_by('-total').first()
+    post = Post.objects.order_by('-comments_count').first()
+    if group is None or post is None:
+        raise RuntimeError('В базе нет данных: запустите без --keepdb.')
+    reads = [
+        ('get', reverse('posts:index'), {}),
+        ('get', reverse('posts:group_list', args=(group.slug,)), {}),
+        ('get', reverse('posts:post_detail', args=(post.pk,)), {}),
+    ]
+    writes = [
+        ('post', reverse('posts:post_create'),
+         {'text': 'Пост из замера', 'group': group.pk}),
+        ('post', reverse('posts:add_comment', args=(post.pk,)),
+         {'text': 'Комментарий из замера'}),
+    ]
+    authors = list(User.objects.order_by('pk')[:writers])
+    return reads, writes, authors
+
+
+def reset_journal(path):
+    '''Возвращает файлу журнал отката: режим WAL хранится в самой базе.'''
+    database = sqlite3.connect(path)
+    try:
+        database.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        database.close()
+
+
+def measure(args, engine):
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    connections.close_all()
+    database = connections.databases['default']
+    if engine == STOCK_ENGINE:
+        reset_journal(database['NAME'])
+    # Потоки открывают свои соединения уже с этим бэкендом.
+    database['ENGINE'] = engine
+    with override_settings(CACHES=DUMMY_CACHES, QUERY_BUDGET_STRICT=False):
+        reads, writes, authors = workload(args.writers)
+        stats = Stats()
+        start = threading.Event()
+        threads = [
+            threading.Thread(target=worker, args=(
+                'read', reads, None, args.seconds, stats, start))
+            for _ in range(args.readers)
+        ] + [
+            threading.Thread(target=worker, args=(
+                'write', writes, author, args.seconds, stats, start))
+            for author in authors
+        ]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        connections.close_all()
+    return stats.summary(args.seconds)
+
+
+def run(args):
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    settings.DATABASES['default']['TEST'] = {'NAME': args.database}
+    setup_test_environment(debug=False)
+    connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False, keepdb=args.keepdb)
+    if not args.keepdb:
+        call_command(
+            'seed_yatube', users=args.users, posts=args.posts,
+            comments=args.comments, follows=args.follows, batch_size=5000,
+            stdout=sys.stderr)
+
+    modes = {'default': STOCK_ENGINE, 'tuned': TUNED_ENGINE}
+    if args.mode != 'both':
+        modes = {args.mode: modes[args.mode]}
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'database': args.database,
+            'seconds': args.seconds,
+            'readers': args.readers,
+            'writers': args.writers,
+            'pragmas': settings.SQLITE_PRAGMAS,
+        },
+        'results': {name: measure(args, engine)
+                    for name, engine in modes.items()},
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    django.setup()
+    report = json.dumps(run(args), ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(report + '\n')
+    print(report)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def events(request):
+    """Включены ли живые обновления страниц (EVENTS_ENABLED)."""
+    return {
+        'events_enabled': settings.EVENTS_ENABLED
+    }
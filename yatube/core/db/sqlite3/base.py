@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    '''Бэкенд SQLite для нескольких потоков и процессов сразу.
+
+    Каждое новое соединение получает SQLITE_PRAGMAS. Транзакции
+    начинаются с BEGIN IMMEDIATE: блокировка на запись берётся сразу,
+    и при занятой базе SQLite ждёт busy_timeout. С обычным BEGIN
+    транзакция, успевшая прочитать данные, при первой записи получает
+    «database is locked» без ожидания, если базу уже пишет другое
+    соединение. Все transaction.atomic в проекте пишут, так что
+    читающим запросам это не мешает.
+
+    '''
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
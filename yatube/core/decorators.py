@@ -0,0 +1,61 @@
+import logging
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    '''Считает SQL-запросы и их суммарное время через execute_wrapper.'''
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.monotonic() - start
+            self.count += 1
+
+
+def query_budget(max_queries: int):
+    '''Ограничивает число SQL-запросов, которые делает view.
+
+    Количество и время запросов пишутся в лог на уровне DEBUG. При
+    превышении бюджета view пишет предупреждение, а если включён
+    QUERY_BUDGET_STRICT (например, в тестах), выбрасывает
+    QueryBudgetExceeded.
+
+    '''
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                response = view_func(request, *args, **kwargs)
+
+            view_name = view_func.__qualname__
+            logger.debug('%s: %d SQL-запросов за %.1f мс', view_name,
+                         counter.count, counter.duration * 1000)
+            if counter.count > max_queries:
+                message = (f'{view_name}: {counter.count} SQL-запросов '
+                           f'при бюджете {max_queries} '
+                           f'({counter.duration * 1000:.1f} мс)')
+                if settings.QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                logger.warning(message)
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
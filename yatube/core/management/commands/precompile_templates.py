@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.precompile import precompile
+
+
+class Command(BaseCommand):
+    help = 'Разбирает и проверяет все шаблоны проекта и приложений.'
+
+    def handle(self, *args, **options):
+        count, errors = precompile()
+        for name, error in errors:
+            self.stderr.write(f'{name}: {error}')
+        if errors:
+            raise CommandError(
+                f'Ошибки в {len(errors)} шаблонах из {count}.')
+        self.stdout.write(self.style.SUCCESS(f'Шаблонов разобрано: {count}.'))
@@ -0,0 +1,56 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import TemplateSyntaxError, engines
+
+
+def template_names(engine):
+    '''Имена всех шаблонов из каталогов загрузчиков движка.'''
+    names = set()
+    for loader in engine.template_loaders:
+        # Кэширующий загрузчик сам файлов не ищет, а оборачивает другие.
+        for inner in getattr(loader, 'loaders', (loader,)):
+            for directory in inner.get_dirs():
+                for root, _, files in os.walk(directory):
+                    names.update(
+                        os.path.relpath(os.path.join(root, name), directory)
+                        .replace(os.sep, '/')
+                        for name in files if not name.startswith('.'))
+    return sorted(names)
+
+
+def precompile():
+    '''Разбирает все шаблоны Django-движков из TEMPLATES.
+
+    С кэширующим загрузчиком разобранные шаблоны остаются в памяти
+    процесса, и первый запрос к странице не тратит время на разбор.
+    Возвращает число шаблонов и список пар (имя шаблона, ошибка).
+
+    '''
+    count = 0
+    errors = []
+    for backend in engines.all():
+        engine = getattr(backend, 'engine', None)
+        if engine is None:
+            continue
+        for name in template_names(engine):
+            try:
+                engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError) as error:
+                errors.append((name, error))
+            count += 1
+    return count, errors
+
+
+def precompile_or_fail():
+    '''Разбирает шаблоны при старте процесса и падает на ошибке.
+
+    Как и команда precompile_templates: воркер со сломанным шаблоном
+    не должен начинать принимать запросы.
+
+    '''
+    count, errors = precompile()
+    if errors:
+        raise ImproperlyConfigured(
+            f'Ошибки в {len(errors)} шаблонах из {count}: '
+            + '; '.join(f'{name}: {error}' for name, error in errors))
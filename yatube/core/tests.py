@@ -1,6 +1,26 @@
+import os
+import shutil
+import tempfile
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import RequestFactory, TestCase, override_settings
+
+from yatube.settings.env import env, env_bool, env_int, env_list
+
+from .db.sqlite3.base import DatabaseWrapper
+from .decorators import QueryBudgetExceeded, query_budget
+from .precompile import precompile_or_fail
+
+User = get_user_model()
 
 
 class ViewTestClass(TestCase):
@@ -9,3 +29,149 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@query_budget(1)
+def two_queries_view(request):
+    User.objects.count()
+    User.objects.exists()
+    return HttpResponse()
+
+
+class QueryBudgetTestClass(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_budget_exceeded_strict(self):
+        '''В строгом режиме превышение бюджета — исключение.'''
+        with self.assertRaises(QueryBudgetExceeded):
+            two_queries_view(self.request)
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_budget_exceeded_warning(self):
+        '''Без строгого режима превышение бюджета пишется в лог.'''
+        with self.assertLogs('core.decorators', level='WARNING'):
+            response = two_queries_view(self.request)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class PrecompileTemplatesTestClass(TestCase):
+    def setUp(self):
+        self.templates_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.templates_dir)
+        self.templates = [{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'DIRS': [self.templates_dir],
+            'OPTIONS': {'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                ]),
+            ]},
+        }]
+
+    def write(self, name, content):
+        path = os.path.join(self.templates_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as template_file:
+            template_file.write(content)
+
+    def test_templates_cached(self):
+        '''Команда разбирает шаблоны и оставляет их в кэше загрузчика.'''
+        self.write('base.html', '{% block content %}{% endblock %}')
+        self.write('includes/card.html', '{{ post.text|linebreaks }}')
+        with override_settings(TEMPLATES=self.templates):
+            stdout = StringIO()
+            call_command('precompile_templates', stdout=stdout)
+            loader = engines['django'].engine.template_loaders[0]
+            self.assertEqual(
+                sorted(loader.get_template_cache),
+                ['base.html', 'includes/card.html'])
+        self.assertIn('2', stdout.getvalue())
+
+    def test_broken_template(self):
+        '''Ошибка в шаблоне останавливает команду.'''
+        self.write('base.html', '{% block content %}')
+        with override_settings(TEMPLATES=self.templates):
+            with self.assertRaises(CommandError):
+                call_command('precompile_templates', stderr=StringIO())
+
+    def test_broken_template_at_startup(self):
+        '''При старте процесса ошибка в шаблоне не проглатывается.'''
+        self.write('base.html', '{% block content %}')
+        with override_settings(TEMPLATES=self.templates):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'base.html'):
+                precompile_or_fail()
+
+    def test_project_templates_valid(self):
+        '''Все шаблоны проекта разбираются без ошибок.'''
+        call_command('precompile_templates', stdout=StringIO())
+
+
+class SettingsEnvTestClass(TestCase):
+    @mock.patch.dict(os.environ, {
+        'YATUBE_FLAG': 'yes', 'YATUBE_NUMBER': '600',
+        'YATUBE_HOSTS': 'example.com, www.example.com,',
+    })
+    def test_env_values(self):
+        '''Переменные окружения приводятся к нужным типам.'''
+        self.assertTrue(env_bool('YATUBE_FLAG'))
+        self.assertEqual(env_int('YATUBE_NUMBER', 0), 600)
+        self.assertEqual(env_list('YATUBE_HOSTS'),
+                         ['example.com', 'www.example.com'])
+
+    def test_env_defaults(self):
+        '''Без переменной берётся значение по умолчанию.'''
+        self.assertFalse(env_bool('YATUBE_MISSING'))
+        self.assertEqual(env_int('YATUBE_MISSING', 5), 5)
+        self.assertEqual(env_list('YATUBE_MISSING', ['a']), ['a'])
+        self.assertEqual(env('YATUBE_MISSING', ''), '')
+
+    def test_test_profile(self):
+        '''Тесты запускаются с профилем test и строгим бюджетом запросов.'''
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+        self.assertEqual(settings.PASSWORD_HASHERS,
+                         ['django.contrib.auth.hashers.MD5PasswordHasher'])
+
+    def test_required_env(self):
+        '''Обязательная переменная без значения — ошибка настройки.'''
+        with self.assertRaises(ImproperlyConfigured):
+            env('YATUBE_MISSING')
+
+
+@override_settings(SQLITE_PRAGMAS={'busy_timeout': 0,
+                                   'journal_mode': 'WAL'})
+class SQLiteBackendTestClass(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        path = os.path.join(self.directory, 'db.sqlite3')
+        self.first, self.second = (
+            DatabaseWrapper({**connection.settings_dict, 'NAME': path})
+            for _ in range(2))
+        for wrapper in (self.first, self.second):
+            self.addCleanup(wrapper.close)
+        with self.first.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id integer)')
+
+    def pragma(self, name):
+        with self.first.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        '''Новое соединение получает SQLITE_PRAGMAS.'''
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('busy_timeout'), 0)
+
+    def test_begin_immediate(self):
+        '''Транзакция сразу берёт блокировку на запись, а читать
+        базу другим соединениям можно.'''
+        self.first.set_autocommit(False)
+        self.first._start_transaction_under_autocommit()
+        self.addCleanup(self.first.rollback)
+        with self.second.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM item')
+            with self.assertRaisesMessage(OperationalError, 'locked'):
+                cursor.execute('INSERT INTO item VALUES (1)')
@@ -1,23 +1,58 @@
+from django.conf import settings
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Group, Post
+from .utils import EstimatedCountPaginator
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    '''Список объектов большой таблицы без COUNT(*) и сканирования.
+
+    Число записей оценивается EstimatedCountPaginator, поиск идёт по
+    полнотекстовому индексу posts.search. Фильтр по дате строит
+    варианты без запросов к таблице, в отличие от фильтров по связям.
+
+    '''
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ('text',)
+    empty_value_display = '-пусто-'
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        ids = search.object_ids(
+            search_term, self.model, settings.ADMIN_SEARCH_LIMIT)
+        return queryset.filter(pk__in=ids), False
 
 
 @admin.register(Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
-    search_fields = ('text',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs)
+        if db_field.name == 'group' and request is not None:
+            # Список групп строится один раз на все строки list_editable.
+            if not hasattr(request, 'group_choices'):
+                request.group_choices = list(formfield.choices)
+            formfield.choices = request.group_choices
+        return formfield
 
 
 admin.site.register(Group)
 
 
 @admin.register(Comment)
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'text', 'created', 'author')
-    search_fields = ('text',)
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
     list_filter = ('created',)
-    empty_value_display = '-пусто-'
@@ -0,0 +1,145 @@
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from core.decorators import query_budget
+
+from . import conditional, timeline
+from .models import Comment, Group, Post
+from .utils import MergedCursorPaginator, paginate_comments, paginate_posts
+
+User = get_user_model()
+
+JSON_DUMPS_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params=JSON_DUMPS_PARAMS)
+
+
+def api_login_required(view_func):
+    '''Как login_required, но отвечает 401 вместо перехода на вход.'''
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response(
+                {'detail': 'Требуется авторизация'}, status=401)
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def page_link(request, cursor, path=None):
+    if not cursor:
+        return None
+    return f'{path or request.path}?cursor={cursor}'
+
+
+def feed_response(request, page_obj):
+    '''Страница ленты: посты и ссылки на соседние страницы по курсору.'''
+    paginator = page_obj.paginator
+    return json_response({
+        'results': [serialize_post(post) for post in page_obj],
+        'next': page_link(request, paginator.next_cursor),
+        'previous': page_link(request, paginator.previous_cursor),
+    })
+
+
+@query_budget(3)
+@require_GET
+@conditional.feed_condition(conditional.index_state)
+def index(request):
+    page_obj = paginate_posts(
+        request, Post.objects.select_related('author', 'group'))
+    return feed_response(request, page_obj)
+
+
+@query_budget(4)
+@require_GET
+@conditional.feed_condition(conditional.group_state)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page_obj = paginate_posts(
+        request, group.posts.select_related('author', 'group'))
+    return feed_response(request, page_obj)
+
+
+@query_budget(4)
+@require_GET
+@conditional.feed_condition(conditional.profile_state)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = paginate_posts(
+        request, author.posts.select_related('author', 'group'))
+    return feed_response(request, page_obj)
+
+
+@query_budget(4)
+@require_GET
+@conditional.feed_condition(conditional.post_state)
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    comments = paginate_comments(post.comments.select_related('author'))
+    data = serialize_post(post)
+    data['comments'] = [serialize_comment(comment) for comment in comments]
+    data['comments_next'] = page_link(
+        request, comments.paginator.next_cursor,
+        reverse('api:post_comments', args=(post.pk,)))
+    return json_response(data)
+
+
+@query_budget(2)
+@require_GET
+def post_comments(request, post_id):
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page_obj = paginate_comments(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        request.GET.get('cursor'))
+    paginator = page_obj.paginator
+    return json_response({
+        'results': [serialize_comment(comment) for comment in page_obj],
+        'next': page_link(request, paginator.next_cursor),
+        'previous': page_link(request, paginator.previous_cursor),
+    })
+
+
+@query_budget(8)
+@require_GET
+@api_login_required
+@conditional.feed_condition(conditional.follow_state)
+def follow_index(request):
+    paginator = MergedCursorPaginator(
+        timeline.feed_sources(request.user),
+        settings.POSTS_PER_PAGE,
+        key='post_id',
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    page_obj.object_list = timeline.load_posts(page_obj)
+    return feed_response(request, page_obj)
@@ -0,0 +1,225 @@
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import (
+    get_cache_key, has_vary_header, learn_cache_key, patch_vary_headers
+)
+
+INDEX_PAGE_CACHE_PREFIX = 'index_page'
+GROUP_PAGE_CACHE_PREFIX = 'group_page'
+PROFILE_PAGE_CACHE_PREFIX = 'profile_page'
+POST_CARD_CACHE_PREFIX = 'post_card'
+
+LOCK_POLL_SECONDS = 0.05
+
+
+def version_key(key_prefix: str) -> str:
+    return f'{key_prefix}.version'
+
+
+def get_version(key_prefix: str) -> int:
+    '''Возвращает текущую версию закэшированных страниц с этим префиксом.'''
+    version = cache.get(version_key(key_prefix))
+    if version is None:
+        cache.add(version_key(key_prefix), 1, None)
+        version = cache.get(version_key(key_prefix), 1)
+    return version
+
+
+def changed_key(key_prefix: str) -> str:
+    return f'{key_prefix}.changed'
+
+
+def get_changed(key_prefix: str):
+    '''Время последнего bump_version для страниц с этим префиксом.
+
+    Если отметки в кэше нет, ею становится текущее время: лучше лишний
+    раз отдать страницу целиком, чем ответить 304 на устаревшую.
+
+    '''
+    changed = cache.get(changed_key(key_prefix))
+    if changed is None:
+        now = timezone.now()
+        cache.add(changed_key(key_prefix), now, None)
+        changed = cache.get(changed_key(key_prefix), now)
+    return changed
+
+
+def bump_version(key_prefix: str) -> None:
+    '''Сбрасывает закэшированные страницы: старые ключи больше не читаются.'''
+    try:
+        cache.incr(version_key(key_prefix))
+    except ValueError:
+        cache.add(version_key(key_prefix), 2, None)
+    cache.set(changed_key(key_prefix), timezone.now(), None)
+
+
+def lock_key(request, prefix: str) -> str:
+    '''Ключ-замок той записи, которую прочтёт get_entry.
+
+    Страницы различаются по заголовкам из Vary (Cookie), поэтому замок
+    берётся по тому же ключу, что и запись. Пока заголовки для адреса
+    не известны, замок общий для всего адреса.
+
+    '''
+    key = get_cache_key(request, prefix, 'GET', cache=cache)
+    if key is None:
+        url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+        key = f'{prefix}.{url}'
+    return f'{key}.lock'
+
+
+def get_entry(request, prefix: str):
+    '''Возвращает пару (ответ, время свежести) из кэша или None.'''
+    key = get_cache_key(request, prefix, 'GET', cache=cache)
+    if key is None:
+        return None
+    return cache.get(key)
+
+
+def wait_for_entry(request, key_prefix: str, version: int, lock: str,
+                   wait: int):
+    '''Ищет копию страницы, пока её пересобирает другой процесс.
+
+    Сначала берёт страницу предыдущей версии, а если её нет — ждёт
+    до wait секунд, пока появится страница текущей версии. Ждать
+    перестаёт, как только замок снят: значит, страница уже в кэше или
+    собравший её процесс её не закэшировал.
+
+    '''
+    prefix = f'{key_prefix}.{version}'
+    entry = None
+    if version > 1:
+        entry = get_entry(request, f'{key_prefix}.{version - 1}')
+    deadline = time.time() + wait
+    while entry is None and time.time() < deadline:
+        time.sleep(LOCK_POLL_SECONDS)
+        entry = get_entry(request, prefix)
+        if entry is None and cache.get(lock) is None:
+            break
+    return entry
+
+
+def skip_cache(request) -> None:
+    '''Не даёт закэшировать страницу и карточку, которые сейчас собираются.
+
+    Нужен, когда в разметку попала временная замена, например оригинал
+    картинки вместо ещё не построенных миниатюр.
+
+    '''
+    if request is not None:
+        request.cache_skips = cache_skips(request) + 1
+
+
+def cache_skips(request) -> int:
+    return getattr(request, 'cache_skips', 0)
+
+
+def should_cache(request, response) -> bool:
+    if response.streaming or response.status_code != 200:
+        return False
+    if cache_skips(request):
+        return False
+    if (not request.COOKIES and response.cookies
+            and has_vary_header(response, 'Cookie')):
+        return False
+    return 'private' not in response.get('Cache-Control', ())
+
+
+def versioned_cache_page(timeout: int, key_prefix: str):
+    '''Кэширует страницу с защитой от одновременной пересборки.
+
+    Ключи включают версию, которую увеличивают сигналы при изменении
+    данных, поэтому страницу можно держать в кэше долго.
+
+    Собирает страницу только один процесс — тот, кто первым занял
+    ключ-замок через cache.add(). Остальные тем временем получают
+    устаревшую копию: просроченную запись той же версии или страницу
+    предыдущей версии. Если устаревшей копии нет, они недолго ждут
+    появления свежей и только потом собирают страницу сами.
+    Нужны только атомарные add/get/set/delete, поэтому подходит любой
+    бэкенд из CACHES, в том числе Redis и memcached.
+
+    '''
+    stale_timeout = settings.PAGE_CACHE_STALE_SECONDS
+    lock_timeout = settings.PAGE_CACHE_LOCK_SECONDS
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            version = get_version(key_prefix)
+            prefix = f'{key_prefix}.{version}'
+            entry = get_entry(request, prefix)
+            if entry is not None and entry[1] > time.time():
+                return entry[0]
+
+            lock = lock_key(request, prefix)
+            if not cache.add(lock, 1, lock_timeout):
+                entry = entry or wait_for_entry(
+                    request, key_prefix, version, lock, lock_timeout)
+                if entry is not None:
+                    return entry[0]
+
+            try:
+                response = view_func(request, *args, **kwargs)
+                # Шапка страницы зависит от пользователя, а Vary: Cookie
+                # от SessionMiddleware появится уже после кэширования.
+                patch_vary_headers(response, ('Cookie',))
+                if should_cache(request, response):
+                    key = learn_cache_key(request, response,
+                                          timeout + stale_timeout,
+                                          prefix, cache=cache)
+                    cache.set(key, (response, time.time() + timeout),
+                              timeout + stale_timeout)
+            finally:
+                cache.delete(lock)
+            return response
+        return wrapper
+    return decorator
+
+
+def stamp_key(kind: str, pk) -> str:
+    return f'{POST_CARD_CACHE_PREFIX}.{kind}.{pk}'
+
+
+def new_stamp() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def bump_stamp(kind: str, pk) -> None:
+    '''Сбрасывает карточки постов, которые зависят от объекта kind.'''
+    cache.set(stamp_key(kind, pk), new_stamp(),
+              settings.POST_CARD_CACHE_SECONDS)
+
+
+def card_keys(posts, variant: str) -> dict:
+    '''Ключи кэша карточек постов за одно обращение к кэшу.
+
+    Ключ карточки включает метки поста, его автора и группы. Сигналы
+    заменяют метку новой случайной строкой, а не увеличивают счётчик,
+    поэтому пропавшая из кэша метка не вернёт старую карточку.
+
+    '''
+    parts = {post.pk: (stamp_key('post', post.pk),
+                       stamp_key('author', post.author_id),
+                       stamp_key('group', post.group_id or 0))
+             for post in posts}
+    stamps = cache.get_many({key for keys in parts.values() for key in keys})
+    for keys in parts.values():
+        for key in keys:
+            if key not in stamps:
+                stamps[key] = new_stamp()
+                cache.add(key, stamps[key], settings.POST_CARD_CACHE_SECONDS)
+    return {
+        pk: f'{POST_CARD_CACHE_PREFIX}.{variant}.{pk}.'
+            + '.'.join(stamps[key] for key in keys)
+        for pk, keys in parts.items()
+    }
@@ -0,0 +1,90 @@
+import hashlib
+
+from django.db.models import Max
+from django.views.decorators.http import condition
+
+from . import timeline
+from .caching import (
+    GROUP_PAGE_CACHE_PREFIX, INDEX_PAGE_CACHE_PREFIX,
+    PROFILE_PAGE_CACHE_PREFIX,
+    get_changed, get_version
+)
+from .models import Post
+
+
+def newest(queryset, field='pub_date'):
+    '''Самая свежая дата в наборе записей; читается с конца индекса.'''
+    return queryset.aggregate(newest=Max(field))['newest']
+
+
+def latest(*dates):
+    return max(filter(None, dates), default=None)
+
+
+def index_state(request):
+    return (latest(newest(Post.objects.all()),
+                   get_changed(INDEX_PAGE_CACHE_PREFIX)),
+            (get_version(INDEX_PAGE_CACHE_PREFIX),))
+
+
+def group_state(request, slug):
+    return (latest(newest(Post.objects.filter(group__slug=slug)),
+                   get_changed(GROUP_PAGE_CACHE_PREFIX)),
+            (get_version(GROUP_PAGE_CACHE_PREFIX),))
+
+
+def profile_state(request, username):
+    return (latest(newest(Post.objects.filter(author__username=username)),
+                   get_changed(PROFILE_PAGE_CACHE_PREFIX)),
+            (get_version(PROFILE_PAGE_CACHE_PREFIX),))
+
+
+def post_state(request, post_id):
+    dates = Post.objects.filter(pk=post_id).annotate(
+        last_comment=Max('comments__created')
+    ).values_list('pub_date', 'last_comment').first() or ()
+    return (latest(*dates, get_changed(INDEX_PAGE_CACHE_PREFIX)),
+            (get_version(INDEX_PAGE_CACHE_PREFIX),))
+
+
+def follow_state(request):
+    dates = [newest(source) for source in
+             timeline.feed_sources(request.user)]
+    return (latest(*dates, get_changed(PROFILE_PAGE_CACHE_PREFIX)),
+            (request.user.pk, get_version(PROFILE_PAGE_CACHE_PREFIX)))
+
+
+def feed_condition(state_func, per_user=False):
+    '''Отвечает 304 на повторный GET, пока лента не изменилась.
+
+    state_func(request, *args, **kwargs) возвращает пару: время
+    последнего изменения (самый новый pub_date или created, а если
+    позже правили или удаляли записи — время bump_version) и кортеж
+    остальных значений, от которых зависит ответ, — например, версий
+    закэшированных страниц, которые растут при правке и удалении.
+    Из них и адреса страницы собирается сильный ETag, а время идёт
+    в Last-Modified. Состояние считается один раз на запрос и до
+    вызова view, так что на 304 страница не собирается.
+
+    per_user добавляет в ETag пользователя — для страниц, шапка и
+    кнопки которых зависят от того, кто вошёл.
+
+    '''
+    def state(request, *args, **kwargs):
+        if not hasattr(request, 'feed_state'):
+            last_modified, parts = state_func(request, *args, **kwargs)
+            if per_user:
+                parts += (request.user.pk,)
+            raw = '|'.join(str(part) for part in (
+                request.get_full_path(), last_modified, *parts))
+            request.feed_state = (
+                hashlib.md5(raw.encode()).hexdigest(), last_modified)
+        return request.feed_state
+
+    def etag(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[0]
+
+    def last_modified(request, *args, **kwargs):
+        return state(request, *args, **kwargs)[1]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+def for_user(user_id: int) -> UserCounters:
+    '''Возвращает счётчики пользователя, создавая их при необходимости.'''
+    return UserCounters.objects.get_or_create(user_id=user_id)[0]
+
+
+def change(queryset, field: str, delta: int) -> None:
+    '''Меняет счётчик на delta одним UPDATE, не опуская его ниже нуля.'''
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_user(user_id: int, field: str, delta: int) -> None:
+    '''Меняет счётчик пользователя.
+
+    Строка счётчиков создаётся только при увеличении: уменьшение
+    может прийти из каскадного удаления самого пользователя.
+
+    '''
+    with transaction.atomic():
+        if delta > 0:
+            UserCounters.objects.get_or_create(user_id=user_id)
+        change(UserCounters.objects.filter(user_id=user_id), field, delta)
+
+
+def change_post_comments(post_id: int, delta: int) -> None:
+    change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def count_subquery(queryset, field: str):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def sync_all() -> None:
+    '''Пересчитывает все счётчики по данным в базе.'''
+    with transaction.atomic():
+        UserCounters.objects.bulk_create(
+            (UserCounters(user_id=user_id) for user_id in
+             User.objects.filter(counters__isnull=True).values_list(
+                 'pk', flat=True)),
+            ignore_conflicts=True,
+        )
+        Post.objects.update(
+            comments_count=count_subquery(Comment.objects, 'post'))
+        UserCounters.objects.update(
+            posts_count=count_subquery(Post.objects, 'author'),
+            followers_count=count_subquery(Follow.objects, 'author'),
+            following_count=count_subquery(Follow.objects, 'user'),
+        )
@@ -0,0 +1,317 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+INDEX_CHANNEL = 'index'
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def group_channel(group_id: int) -> str:
+    return f'group.{group_id}'
+
+
+def author_channel(author_id: int) -> str:
+    return f'author.{author_id}'
+
+
+def post_channel(post_id: int) -> str:
+    return f'post.{post_id}'
+
+
+class LocalSubscription:
+    def __init__(self, broker, channels, positions):
+        self.broker = broker
+        self.channels = channels
+        self.positions = positions
+        self.messages = queue.Queue(settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, message):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # Медленный клиент теряет события, а не держит публикацию.
+            pass
+
+    def get(self, timeout: float) -> list:
+        try:
+            messages = [self.messages.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    '''Pub/sub в памяти процесса.
+
+    События видят только подписчики того же процесса, поэтому бэкенд
+    подходит для runserver и сервера с одним процессом и потоками.
+    События нумеруются общим счётчиком и EVENTS_CACHE_SECONDS хранятся
+    в памяти, чтобы переподключившийся клиент получил пропущенные.
+
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+        self.sequence = 0
+        self.history = deque()
+
+    def publish(self, channel: str, event: str, data: dict) -> None:
+        now = time.monotonic()
+        with self.lock:
+            self.sequence += 1
+            message = (channel, self.sequence, event, data)
+            self.history.append((now, message))
+            while self.history[0][0] < now - settings.EVENTS_CACHE_SECONDS:
+                self.history.popleft()
+            subscriptions = list(self.subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channels, positions=None) -> LocalSubscription:
+        '''Подписывает на каналы; с positions досылает пропущенное.'''
+        with self.lock:
+            subscription = LocalSubscription(
+                self, channels,
+                dict.fromkeys(channels, self.sequence))
+            if positions is not None:
+                subscription.positions.update(positions)
+                for _, message in self.history:
+                    channel, number = message[:2]
+                    if number > subscription.positions.get(
+                            channel, self.sequence):
+                        subscription.put(message)
+            for channel in channels:
+                self.subscriptions.setdefault(channel, set()).add(
+                    subscription)
+        return subscription
+
+    def unsubscribe(self, subscription) -> None:
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self.subscriptions.pop(channel, None)
+
+
+class CacheSubscription:
+    def __init__(self, broker, channels, positions=None):
+        self.broker = broker
+        self.channels = list(channels)
+        self.positions = broker.positions(self.channels)
+        if positions is not None:
+            self.positions.update(positions)
+
+    def get(self, timeout: float) -> list:
+        deadline = time.monotonic() + timeout
+        while True:
+            messages = self.broker.read(self.positions)
+            if messages or time.monotonic() >= deadline:
+                return messages
+            time.sleep(min(settings.EVENTS_POLL_SECONDS,
+                           max(deadline - time.monotonic(), 0)))
+
+    def close(self):
+        pass
+
+
+class CacheBroker:
+    '''Pub/sub через кэш Django для нескольких процессов и серверов.
+
+    Каждый канал — счётчик в кэше EVENTS_CACHE и по ключу на событие,
+    который живёт EVENTS_CACHE_SECONDS. Подписчики раз в
+    EVENTS_POLL_SECONDS одним get_many сверяют счётчики своих каналов
+    и дочитывают новые события. Нужен общий для всех процессов кэш,
+    например Redis или memcached.
+
+    '''
+
+    def __init__(self):
+        self.cache = caches[settings.EVENTS_CACHE]
+
+    def sequence_key(self, channel: str) -> str:
+        return f'events.{channel}'
+
+    def event_key(self, channel: str, number: int) -> str:
+        return f'events.{channel}.{number}'
+
+    def publish(self, channel: str, event: str, data: dict) -> None:
+        key = self.sequence_key(channel)
+        self.cache.add(key, 0, None)
+        try:
+            number = self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, None)
+            number = 1
+        self.cache.set(self.event_key(channel, number), (event, data),
+                       settings.EVENTS_CACHE_SECONDS)
+
+    def positions(self, channels) -> dict:
+        keys = {self.sequence_key(channel): channel for channel in channels}
+        numbers = self.cache.get_many(keys)
+        return {channel: numbers.get(key, 0) for key, channel in keys.items()}
+
+    def read(self, positions: dict) -> list:
+        '''Новые события каналов после positions; сдвигает positions.
+
+        Из каждого канала читается не больше EVENTS_QUEUE_SIZE последних
+        событий, даже если клиент отстал сильнее.
+
+        '''
+        wanted = []
+        for channel, number in self.positions(positions).items():
+            start = max(positions[channel],
+                        number - settings.EVENTS_QUEUE_SIZE)
+            wanted.extend((channel, position) for position
+                          in range(start + 1, number + 1))
+            # Счётчик мог пропасть из кэша и начаться заново.
+            positions[channel] = number
+        if not wanted:
+            return []
+        events = self.cache.get_many(
+            [self.event_key(channel, number) for channel, number in wanted])
+        messages = []
+        for channel, number in wanted:
+            message = events.get(self.event_key(channel, number))
+            if message is not None:
+                messages.append((channel, number) + tuple(message))
+        return messages
+
+    def subscribe(self, channels, positions=None) -> CacheSubscription:
+        return CacheSubscription(self, channels, positions)
+
+
+def broker():
+    '''Бэкенд событий из настройки EVENTS_BACKEND.'''
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.EVENTS_BACKEND)()
+        return _broker
+
+
+@receiver(setting_changed)
+def reset_broker(setting, **kwargs):
+    global _broker
+    if setting.startswith('EVENTS_'):
+        with _broker_lock:
+            _broker = None
+
+
+def publish(channels, event: str, data: dict) -> None:
+    '''Отправляет событие в каналы после коммита транзакции.'''
+    def send():
+        for channel in channels:
+            broker().publish(channel, event, data)
+    transaction.on_commit(send)
+
+
+def publish_post(post) -> None:
+    channels = [INDEX_CHANNEL, author_channel(post.author_id)]
+    if post.group_id:
+        channels.append(group_channel(post.group_id))
+    publish(channels, 'post', {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+    })
+
+
+def publish_comment(comment) -> None:
+    publish([post_channel(comment.post_id)], 'comment', {
+        'id': comment.pk,
+        'post': comment.post_id,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created,
+    })
+
+
+def format_event_id(positions: dict) -> str:
+    '''Номера последних событий каналов для поля id.
+
+    Каналы без событий не пишутся: при возобновлении их номер — 0.
+
+    '''
+    return ','.join(f'{channel}={number}'
+                    for channel, number in sorted(positions.items())
+                    if number)
+
+
+def parse_event_id(value: str, channels):
+    '''Позиции каналов из Last-Event-ID или None, если его нет.'''
+    if not value:
+        return None
+    positions = dict.fromkeys(channels, 0)
+    for part in value.split(','):
+        channel, _, number = part.partition('=')
+        if channel in positions and number.isdigit():
+            positions[channel] = int(number)
+    return positions
+
+
+def format_event(event: str, data: dict, event_id: str = '') -> str:
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False,
+                         separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'
+
+
+class EventStream:
+    '''Поток text/event-stream с событиями каналов.
+
+    Подписка оформляется сразу, ещё до первой отдачи данных, а
+    закрывается вместе с ответом. У каждого события есть id с номерами
+    последних событий всех каналов: переподключаясь, браузер присылает
+    его в Last-Event-ID, и поток начинается с пропущенных событий.
+    Пока событий нет, раз в EVENTS_HEARTBEAT_SECONDS уходит комментарий,
+    чтобы прокси не закрыли соединение. Через EVENTS_STREAM_SECONDS
+    поток кончается, и браузер переподключается через EVENTS_RETRY_MS.
+    Пока поток открыт, он держит рабочий процесс или поток сервера,
+    поэтому с синхронными воркерами потоки выключают настройкой
+    EVENTS_ENABLED.
+
+    '''
+
+    def __init__(self, channels, last_event_id: str = ''):
+        self.subscription = broker().subscribe(
+            channels, parse_event_id(last_event_id, channels))
+        self.positions = dict(self.subscription.positions)
+
+    def __iter__(self):
+        deadline = time.monotonic() + settings.EVENTS_STREAM_SECONDS
+        yield f'retry: {settings.EVENTS_RETRY_MS}\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            messages = self.subscription.get(
+                min(settings.EVENTS_HEARTBEAT_SECONDS, remaining))
+            if not messages:
+                yield ': ping\n\n'
+            for channel, number, event, data in messages:
+                self.positions[channel] = number
+                yield format_event(event, data,
+                                   format_event_id(self.positions))
+
+    def close(self):
+        self.subscription.close()
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import uploads
 from .models import Comment, Group, Post
 
 
@@ -18,6 +20,29 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Отклонённые ImageUploadHandler файлы не передаются в поле:
+        # ImageField не смог бы их открыть и выдал бы общую ошибку.
+        self.files = self.files.copy()
+        self.upload_errors = uploads.pop_rejected(self.files)
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+        error = (uploads.size_error(image.size)
+                 or uploads.dimensions_error(image.image.size))
+        if error:
+            raise forms.ValidationError(error)
+        return uploads.shrink(image)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field, error in self.upload_errors.items():
+            self.add_error(field, error)
+        return cleaned_data
+
 
 class CommentForm(forms.ModelForm):
     text = forms.CharField(
@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS kvstore ('
+          'key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID')
+
+STORES = []
+
+
+class LRU:
+    '''Потокобезопасный LRU-кэш на OrderedDict.'''
+
+    def __init__(self, size: int):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+def database_path() -> str:
+    '''Файл хранилища: THUMBNAIL_KVSTORE_PATH или var/ проекта.
+
+    Не MEDIA_ROOT: его раздаёт веб-сервер, а файл хранилища наружу
+    отдавать незачем.
+
+    '''
+    if settings.THUMBNAIL_KVSTORE_PATH:
+        return settings.THUMBNAIL_KVSTORE_PATH
+    return os.path.join(settings.BASE_DIR, 'var', 'kvstore.sqlite3')
+
+
+class KVStore(KVStoreBase):
+    '''Key-value хранилище sorl-thumbnail в файле SQLite в режиме WAL.
+
+    Перед файлом стоит LRU в памяти процесса на
+    THUMBNAIL_KVSTORE_LRU_SIZE записей, так что повторные обращения к
+    миниатюре не выходят за пределы процесса. У каждого потока и
+    процесса своё соединение: WAL позволяет читать, пока другой процесс
+    пишет. Удаление в одном процессе не сбрасывает LRU других, но файлы
+    удаляются только у картинок, на которые больше нет постов.
+
+    '''
+
+    def __init__(self):
+        super().__init__()
+        self.local = threading.local()
+        self.lru = LRU(settings.THUMBNAIL_KVSTORE_LRU_SIZE)
+        self.generation = 0
+        STORES.append(self)
+
+    def reset(self):
+        '''Забывает LRU и переоткрывает соединения при следующем запросе.'''
+        self.lru = LRU(settings.THUMBNAIL_KVSTORE_LRU_SIZE)
+        self.generation += 1
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        owner = (os.getpid(), self.generation)
+        if getattr(self.local, 'owner', None) != owner:
+            if getattr(self.local, 'connection', None) is not None:
+                self.local.connection.close()
+            path = database_path()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(SCHEMA)
+            self.local.connection = connection
+            self.local.owner = owner
+        return self.local.connection
+
+    def _get_raw(self, key):
+        value = self.lru.get(key)
+        if value is None:
+            row = self.connection.execute(
+                'SELECT value FROM kvstore WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            value = row[0]
+            self.lru.set(key, value)
+        return value
+
+    def _set_raw(self, key, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+            (key, value))
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys):
+        self.connection.executemany(
+            'DELETE FROM kvstore WHERE key = ?', [(key,) for key in keys])
+        self.lru.delete(*keys)
+
+    def _find_keys_raw(self, prefix):
+        rows = self.connection.execute(
+            'SELECT key FROM kvstore WHERE key >= ? AND key < ?',
+            (prefix, prefix + chr(0x10FFFF)))
+        return [key for key, in rows]
+
+
+@receiver(setting_changed)
+def reset_stores(setting, **kwargs):
+    if setting in ('MEDIA_ROOT', 'THUMBNAIL_KVSTORE_PATH',
+                   'THUMBNAIL_KVSTORE_LRU_SIZE'):
+        for store in STORES:
+            store.reset()
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import Seeder
+
+
+def image_size(value):
+    width, _, height = value.partition('x')
+    return int(width), int(height)
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу сгенерированными пользователями, постами и т.д.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='объектов в одном bulk_create')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='процессов для генерации данных')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='зерно генератора: одинаковое зерно даёт '
+                                 'одинаковые данные')
+        parser.add_argument('--images', type=float, default=0.0,
+                            help='доля постов с картинкой, от 0 до 1')
+        parser.add_argument('--image-size', type=image_size,
+                            default=(960, 540), help='размер картинки, WxH')
+        parser.add_argument('--prefix', default='seed',
+                            help='префикс имён пользователей и слагов групп')
+        parser.add_argument('--days', type=int, default=365,
+                            help='за сколько дней раскидать даты постов')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size и --workers должны быть > 0.')
+        if not 0 <= options['images'] <= 1:
+            raise CommandError('--images должно быть от 0 до 1.')
+        Seeder(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], comments=options['comments'],
+            follows=options['follows'], batch_size=options['batch_size'],
+            workers=options['workers'], seed=options['seed'],
+            images=options['images'], image_size=options['image_size'],
+            prefix=options['prefix'], days=max(options['days'], 1),
+            stdout=self.stdout,
+        ).run()
+        self.stdout.write(self.style.SUCCESS('База заполнена.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import sync_timelines
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает ленты подписчиков авторов, которые стали '
+            'или перестали быть популярными.')
+
+    def handle(self, *args, **options):
+        count = sync_timelines()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты обновлены для авторов: {count}.'))
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры картинок последних постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000,
+                            help='сколько последних постов прогреть')
+        parser.add_argument('--workers', type=int,
+                            default=max(settings.THUMBNAIL_WORKERS, 1),
+                            help='потоков для построения миниатюр')
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by(
+            '-pub_date', '-pk').values_list('image', flat=True)
+        # Одна картинка может принадлежать нескольким постам.
+        names = list(dict.fromkeys(names[:options['posts']]))
+        field = Post._meta.get_field('image')
+        images = [field.attr_class(None, field, name) for name in names]
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            built = pool.map(
+                lambda image: thumbnails.generate(image, refresh=False),
+                images)
+            names = [image.name for image, done in zip(images, built)
+                     if done]
+        if names:
+            thumbnails.refresh_cards(names)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры построены для {len(images)} картинок.'))
@@ -0,0 +1,78 @@
+import logging
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from sorl import thumbnail
+
+from .models import Post, StoredImage
+
+logger = logging.getLogger(__name__)
+
+
+def acquire(name: str, content=None) -> None:
+    '''Учитывает ещё одну ссылку на файл.
+
+    Строка ссылок создаётся, только если её не было: значит, файл мог
+    удалить параллельный collect уже после того, как storage.save нашёл
+    его на диске. Тогда файл записывается заново из content.
+
+    '''
+    while True:
+        updated = StoredImage.objects.filter(name=name).update(
+            references=F('references') + 1)
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                StoredImage.objects.create(name=name, references=1)
+        except IntegrityError:
+            # Строку успел создать параллельный запрос: прибавляем к ней.
+            continue
+        break
+    storage = Post._meta.get_field('image').storage
+    if content is not None and not storage.exists(name):
+        content.seek(0)
+        storage._save(name, content)
+
+
+def release(name: str) -> None:
+    '''Снимает ссылку на файл и удаляет его после коммита, если ссылок нет.'''
+    StoredImage.objects.filter(name=name, references__gt=0).update(
+        references=F('references') - 1)
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name: str) -> None:
+    '''Удаляет файл без ссылок вместе с его миниатюрами.
+
+    Строка ссылок блокируется до удаления файла: acquire, пришедший в это
+    время, дождётся коммита и заново создаст и строку, и файл.
+
+    '''
+    with transaction.atomic():
+        stored = StoredImage.objects.select_for_update().filter(
+            name=name, references=0).first()
+        if stored is None:
+            return
+        stored.delete()
+        field = Post._meta.get_field('image')
+        try:
+            thumbnail.delete(field.attr_class(None, field, name))
+        except (OSError, SuspiciousFileOperation):
+            logger.exception('Не удалось удалить файл %s', name)
+
+
+def sync_references() -> None:
+    '''Пересчитывает ссылки на файлы по постам.
+
+    Нужна после массовой загрузки данных в обход сигналов.
+
+    '''
+    references = (Post.objects.exclude(image='').order_by()
+                  .values_list('image').annotate(total=Count('pk')))
+    with transaction.atomic():
+        StoredImage.objects.all().delete()
+        StoredImage.objects.bulk_create(
+            StoredImage(name=name, references=total)
+            for name, total in references.iterator())
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db import migrations
+
+from posts.stemmer import stem_words
+
+
+def create_sqlite_index(apps, cursor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    cursor.execute(
+        "CREATE VIRTUAL TABLE posts_search USING fts5("
+        "body, kind UNINDEXED, post_id UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2')")
+    insert = ('INSERT INTO posts_search (rowid, body, kind, post_id) '
+              'VALUES (%s, %s, %s, %s)')
+    cursor.executemany(insert, [
+        (pk * 2, ' '.join(stem_words(text)), 'p', pk)
+        for pk, text in Post.objects.values_list('pk', 'text')
+    ])
+    cursor.executemany(insert, [
+        (pk * 2 + 1, ' '.join(stem_words(text)), 'c', post_id)
+        for pk, post_id, text in Comment.objects.values_list(
+            'pk', 'post_id', 'text')
+    ])
+
+
+def create_postgresql_index(apps, cursor):
+    config = settings.SEARCH_POSTGRES_CONFIG
+    cursor.execute(
+        'CREATE TABLE posts_search ('
+        'kind char(1) NOT NULL, object_id integer NOT NULL, '
+        'post_id integer NOT NULL, vector tsvector NOT NULL, '
+        'PRIMARY KEY (kind, object_id))')
+    cursor.execute(
+        'CREATE INDEX posts_search_vector ON posts_search USING GIN (vector)')
+    cursor.execute(
+        "INSERT INTO posts_search (kind, object_id, post_id, vector) "
+        "SELECT 'p', id, id, to_tsvector(%s, text) FROM posts_post",
+        [config])
+    cursor.execute(
+        "INSERT INTO posts_search (kind, object_id, post_id, vector) "
+        "SELECT 'c', id, post_id, to_tsvector(%s, text) FROM posts_comment",
+        [config])
+
+
+CREATE_INDEX = {
+    'sqlite': create_sqlite_index,
+    'postgresql': create_postgresql_index,
+}
+
+
+def create_index(apps, schema_editor):
+    create = CREATE_INDEX.get(schema_editor.connection.vendor)
+    if create is not None:
+        with schema_editor.connection.cursor() as cursor:
+            create(apps, cursor)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor in CREATE_INDEX:
+        schema_editor.execute('DROP TABLE posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_stored_images'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Посты подмешиваются при чтении'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+def mark_built_timelines(apps, schema_editor):
+    # До этой миграции ленты перестраивались вместе со сменой флага.
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    UserCounters.objects.filter(celebrity=True).update(
+        celebrity_timelines=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_celebrity_flag'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercounters',
+            name='celebrity_timelines',
+            field=models.BooleanField(default=False, verbose_name='Ленты собраны как для популярного'),
+        ),
+        migrations.AlterField(
+            model_name='usercounters',
+            name='celebrity',
+            field=models.BooleanField(default=False, verbose_name='Популярный автор'),
+        ),
+        migrations.RunPython(mark_built_timelines, migrations.RunPython.noop),
+    ]
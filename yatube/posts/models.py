@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 UPLOAD_DIR = 'posts/'
@@ -39,13 +41,25 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to=UPLOAD_DIR,
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Количество комментариев')
 
     class Meta:
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -66,6 +80,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('created',)
+        indexes = (
+            models.Index(fields=('post', 'created', 'id'),
+                         name='comment_post_created'),
+        )
 
     def __str__(self):
         return self.text[:20]
@@ -86,3 +104,58 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=('user', 'author'),
                                     name='unique_user_author'),
         )
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(User, primary_key=True,
+                                related_name='counters',
+                                on_delete=models.CASCADE,
+                                verbose_name='Пользователь')
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество постов')
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Количество подписок')
+    celebrity = models.BooleanField(
+        default=False, verbose_name='Популярный автор')
+    celebrity_timelines = models.BooleanField(
+        default=False, verbose_name='Ленты собраны как для популярного')
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(User, related_name='timeline',
+                             on_delete=models.CASCADE,
+                             verbose_name='Читатель')
+    post = models.ForeignKey(Post, related_name='timeline_entries',
+                             on_delete=models.CASCADE,
+                             verbose_name='Пост')
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('user', '-pub_date', '-post'),
+                         name='timeline_user_pub_date_post'),
+        )
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_user_post'),
+        )
+
+
+class StoredImage(models.Model):
+    name = models.CharField(max_length=100, primary_key=True,
+                            verbose_name='Файл')
+    references = models.PositiveIntegerField(
+        default=0, verbose_name='Количество ссылок')
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
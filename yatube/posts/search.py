@@ -0,0 +1,271 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from .models import Comment, Post
+from .stemmer import stem_words
+from .utils import CURSOR_NEXT, CursorPaginator
+
+POST = 'p'
+COMMENT = 'c'
+# Совпадение в тексте поста весит больше, чем в комментарии к нему.
+POST_WEIGHT = 2.0
+INDEX_TABLE = 'posts_search'
+
+SearchHit = namedtuple('SearchHit', ('post_id', 'score'))
+
+
+def keyset(position):
+    '''Условие и порядок для страницы результатов после курсора.'''
+    if position is None:
+        return '', [], 'DESC'
+    direction, score, post_id = position
+    if direction == CURSOR_NEXT:
+        return ('WHERE score < %s OR (score = %s AND post_id < %s)',
+                [score, score, post_id], 'DESC')
+    return ('WHERE score > %s OR (score = %s AND post_id > %s)',
+            [score, score, post_id], 'ASC')
+
+
+class SQLiteBackend:
+    '''Индекс в виртуальной таблице FTS5.
+
+    У FTS5 нет русского стеммера, поэтому в индекс и в запрос попадают
+    основы слов, посчитанные posts.stemmer. rowid записи выводится из
+    id объекта, так что обновление и удаление идут по первичному ключу.
+
+    '''
+
+    def rowid(self, kind: str, object_id: int) -> int:
+        return object_id * 2 + (kind == COMMENT)
+
+    def document(self, text: str) -> str:
+        return ' '.join(stem_words(text))
+
+    def match(self, query: str) -> str:
+        return ' '.join('"{}"'.format(word.replace('"', '""'))
+                        for word in stem_words(query))
+
+    def index(self, kind, object_id, post_id, text):
+        rowid = self.rowid(kind, object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s', [rowid])
+            cursor.execute(
+                f'INSERT INTO {INDEX_TABLE} (rowid, body, kind, post_id) '
+                f'VALUES (%s, %s, %s, %s)',
+                [rowid, self.document(text), kind, post_id])
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE} WHERE rowid = %s',
+                           [self.rowid(kind, object_id)])
+
+    def search(self, query, position, limit):
+        match = self.match(query)
+        if not match:
+            return []
+        where, params, order = keyset(position)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, score FROM ('
+                f'SELECT post_id, MAX(-rank * CASE kind WHEN %s THEN %s '
+                f'ELSE 1.0 END) AS score FROM ('
+                f'SELECT post_id, kind, rank FROM {INDEX_TABLE} '
+                f'WHERE {INDEX_TABLE} MATCH %s) GROUP BY post_id) {where} '
+                f'ORDER BY score {order}, post_id {order} LIMIT %s',
+                [POST, POST_WEIGHT, match, *params, limit])
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def object_ids(self, query, kind, limit):
+        match = self.match(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} '
+                f'MATCH %s AND kind = %s ORDER BY rank LIMIT %s',
+                [match, kind, limit])
+            return [rowid // 2 for rowid, in cursor.fetchall()]
+
+    def rebuild(self):
+        rows = (
+            (self.rowid(POST, pk), self.document(text), POST, pk)
+            for pk, text in Post.objects.values_list('pk', 'text').iterator()
+        ), (
+            (self.rowid(COMMENT, pk), self.document(text), COMMENT, post_id)
+            for pk, post_id, text in Comment.objects.values_list(
+                'pk', 'post_id', 'text').iterator()
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+            for documents in rows:
+                cursor.executemany(
+                    f'INSERT INTO {INDEX_TABLE} (rowid, body, kind, post_id) '
+                    f'VALUES (%s, %s, %s, %s)', documents)
+
+
+class PostgreSQLBackend:
+    '''Индекс в таблице с tsvector и GIN-индексом.
+
+    Основы слов считает сам PostgreSQL по конфигурации
+    SEARCH_POSTGRES_CONFIG (по умолчанию russian).
+
+    '''
+
+    def index(self, kind, object_id, post_id, text):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {INDEX_TABLE} (kind, object_id, post_id, '
+                f'vector) VALUES (%s, %s, %s, to_tsvector(%s, %s)) '
+                f'ON CONFLICT (kind, object_id) DO UPDATE '
+                f'SET post_id = EXCLUDED.post_id, vector = EXCLUDED.vector',
+                [kind, object_id, post_id,
+                 settings.SEARCH_POSTGRES_CONFIG, text])
+
+    def remove(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {INDEX_TABLE} '
+                f'WHERE kind = %s AND object_id = %s', [kind, object_id])
+
+    def search(self, query, position, limit):
+        if not stem_words(query):
+            return []
+        where, params, order = keyset(position)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, score FROM ('
+                f'SELECT post_id, MAX(ts_rank(vector, query) * CASE kind '
+                f'WHEN %s THEN %s ELSE 1.0 END) AS score '
+                f'FROM {INDEX_TABLE}, plainto_tsquery(%s, %s) query '
+                f'WHERE vector @@ query GROUP BY post_id) ranked {where} '
+                f'ORDER BY score {order}, post_id {order} LIMIT %s',
+                [POST, POST_WEIGHT, settings.SEARCH_POSTGRES_CONFIG, query,
+                 *params, limit])
+            return [SearchHit(*row) for row in cursor.fetchall()]
+
+    def object_ids(self, query, kind, limit):
+        if not stem_words(query):
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT object_id FROM {INDEX_TABLE}, '
+                f'plainto_tsquery(%s, %s) query '
+                f'WHERE vector @@ query AND kind = %s '
+                f'ORDER BY ts_rank(vector, query) DESC LIMIT %s',
+                [settings.SEARCH_POSTGRES_CONFIG, query, kind, limit])
+            return [object_id for object_id, in cursor.fetchall()]
+
+    def rebuild(self):
+        config = settings.SEARCH_POSTGRES_CONFIG
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {INDEX_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {INDEX_TABLE} (kind, object_id, post_id, '
+                f'vector) SELECT %s, id, id, to_tsvector(%s, text) '
+                f'FROM {Post._meta.db_table}', [POST, config])
+            cursor.execute(
+                f'INSERT INTO {INDEX_TABLE} (kind, object_id, post_id, '
+                f'vector) SELECT %s, id, post_id, to_tsvector(%s, text) '
+                f'FROM {Comment._meta.db_table}', [COMMENT, config])
+
+
+class FallbackBackend:
+    '''Поиск подстроки для баз без полнотекстового индекса.
+
+    Все найденные посты получают одинаковый вес и идут от новых к
+    старым.
+
+    '''
+
+    def index(self, kind, object_id, post_id, text):
+        pass
+
+    def remove(self, kind, object_id):
+        pass
+
+    def search(self, query, position, limit):
+        query = query.strip()
+        if not query:
+            return []
+        matches = Post.objects.filter(
+            Q(text__icontains=query) | Q(comments__text__icontains=query))
+        posts = Post.objects.filter(pk__in=matches.values('pk'))
+        ordering = '-pk'
+        if position is not None:
+            direction, _, post_id = position
+            if direction == CURSOR_NEXT:
+                posts = posts.filter(pk__lt=post_id)
+            else:
+                posts = posts.filter(pk__gt=post_id)
+                ordering = 'pk'
+        return [SearchHit(pk, 0.0) for pk in posts.order_by(
+            ordering).values_list('pk', flat=True)[:limit]]
+
+    def object_ids(self, query, kind, limit):
+        model = Post if kind == POST else Comment
+        return list(model.objects.filter(
+            text__icontains=query.strip()).order_by('-pk').values_list(
+                'pk', flat=True)[:limit])
+
+    def rebuild(self):
+        pass
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgreSQLBackend,
+}
+
+
+def backend():
+    return BACKENDS.get(connection.vendor, FallbackBackend)()
+
+
+def index_post(post) -> None:
+    backend().index(POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment) -> None:
+    backend().index(COMMENT, comment.pk, comment.post_id, comment.text)
+
+
+def remove_post(post) -> None:
+    backend().remove(POST, post.pk)
+
+
+def remove_comment(comment) -> None:
+    backend().remove(COMMENT, comment.pk)
+
+
+def object_ids(query: str, model, limit: int) -> list:
+    '''id постов или комментариев с совпадением в их собственном тексте.'''
+    kind = POST if model is Post else COMMENT
+    return backend().object_ids(query, kind, limit)
+
+
+def rebuild() -> None:
+    '''Пересобирает индекс целиком, например после массовой загрузки.'''
+    backend().rebuild()
+
+
+class SearchPaginator(CursorPaginator):
+    '''Keyset-пагинация результатов поиска по паре (вес, id поста).
+
+    object_list — строка запроса. Страница состоит из SearchHit, сами
+    посты подгружаются отдельно.
+
+    '''
+
+    def __init__(self, query, per_page):
+        super().__init__(query, per_page, field='score', key='post_id')
+
+    def parse_value(self, value):
+        return float(value)
+
+    def rows(self, position):
+        return backend().search(self.object_list, position,
+                                self.per_page + 1)
@@ -0,0 +1,241 @@
+import multiprocessing
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from io import BytesIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from . import caching, counters, media, search, timeline
+from .models import UPLOAD_DIR, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+SEED_UPLOAD_DIR = UPLOAD_DIR + 'seed/'
+KINDS = ('users', 'groups', 'posts', 'comments', 'follows')
+
+_fake = None
+
+
+def get_fake(seed: int) -> Faker:
+    global _fake
+    if _fake is None:
+        _fake = Faker('ru_RU')
+    _fake.seed_instance(seed)
+    return _fake
+
+
+def object_seed(seed: int, kind: str, number: int) -> str:
+    '''Зерно объекта зависит только от его номера, а не от разбиения.'''
+    return f'{seed}-{KINDS.index(kind)}-{number}'
+
+
+def make_image(rnd: random.Random, size) -> bytes:
+    image = Image.new('RGB', size, tuple(rnd.randrange(256) for _ in '123'))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    for _ in range(8):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        draw.ellipse(
+            (x, y, x + rnd.randrange(1, width), y + rnd.randrange(1, height)),
+            fill=tuple(rnd.randrange(256) for _ in '123'))
+    content = BytesIO()
+    image.save(content, 'JPEG', quality=80)
+    return content.getvalue()
+
+
+def generate_user(fake, rnd, number, options):
+    return (f'{options["prefix"]}{number}', fake.first_name(),
+            fake.last_name())
+
+
+def generate_group(fake, rnd, number, options):
+    prefix = options['prefix']
+    return (f'Группа {prefix}{number}', f'{prefix}-group-{number}',
+            fake.sentence())
+
+
+def generate_post(fake, rnd, number, options):
+    image = ''
+    if rnd.random() < options['images']:
+        image = Post._meta.get_field('image').storage.save(
+            f'{SEED_UPLOAD_DIR}{options["prefix"]}_{number}.jpg',
+            ContentFile(make_image(rnd, options['image_size'])))
+    return (
+        fake.text(max_nb_chars=300),
+        rnd.randrange(options['users']),
+        rnd.randrange(options['groups'] + 1),
+        rnd.randrange(options['span']),
+        image,
+    )
+
+
+def generate_comment(fake, rnd, number, options):
+    return (rnd.randrange(options['posts']), rnd.randrange(options['users']),
+            fake.sentence(), rnd.randrange(options['span']))
+
+
+def generate_follow(fake, rnd, number, options):
+    return tuple(rnd.sample(range(options['users']), 2))
+
+
+GENERATORS = {
+    'users': generate_user,
+    'groups': generate_group,
+    'posts': generate_post,
+    'comments': generate_comment,
+    'follows': generate_follow,
+}
+
+
+def generate_chunk(task):
+    '''Генерирует значения полей для одной пачки объектов.
+
+    Выполняется в рабочих процессах, поэтому возвращает только кортежи
+    простых значений, а не объекты моделей.
+
+    '''
+    kind, start, size, seed, options = task
+    rows = []
+    for number in range(start, start + size):
+        number_seed = object_seed(seed, kind, number)
+        rows.append(GENERATORS[kind](
+            get_fake(number_seed), random.Random(number_seed), number,
+            options))
+    return rows
+
+
+@contextmanager
+def explicit_dates(*fields):
+    '''Отключает auto_now_add, чтобы сохранить сгенерированные даты.'''
+    saved = [(field, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+class Seeder:
+    '''Наполняет базу сгенерированными данными пачками через bulk_create.
+
+    Значения полей готовят workers процессов, а в базу пишет только
+    основной процесс. Каждый объект получает зерно по своему номеру,
+    поэтому при одном и том же seed результат не зависит ни от числа
+    процессов, ни от размера пачки.
+
+    '''
+
+    def __init__(self, users=0, groups=0, posts=0, comments=0, follows=0,
+                 batch_size=1000, workers=1, seed=0, images=0.0,
+                 image_size=(960, 540), prefix='seed', days=365,
+                 stdout=None):
+        self.counts = {'users': users, 'groups': groups, 'posts': posts,
+                       'comments': comments, 'follows': follows}
+        self.batch_size = batch_size
+        self.workers = workers
+        self.seed = seed
+        self.stdout = stdout
+        self.options = {
+            'prefix': prefix, 'images': images, 'image_size': image_size,
+            'span': days * 24 * 60 * 60,
+        }
+        self.now = timezone.now()
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def chunks(self, pool, kind):
+        tasks = [
+            (kind, start, min(self.batch_size, self.counts[kind] - start),
+             self.seed, self.options)
+            for start in range(0, self.counts[kind], self.batch_size)
+        ]
+        if pool is None:
+            return map(generate_chunk, tasks)
+        return pool.imap(generate_chunk, tasks)
+
+    def insert(self, pool, kind, model, build):
+        inserted = 0
+        for rows in self.chunks(pool, kind):
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    [build(row) for row in rows], ignore_conflicts=True)
+            inserted += len(rows)
+        self.log(f'{kind}: {inserted}')
+
+    def seed_users(self, pool):
+        self.insert(pool, 'users', User, lambda row: User(
+            username=row[0], first_name=row[1], last_name=row[2],
+            password='!'))
+        self.user_ids = list(User.objects.filter(
+            username__regex=rf'^{self.options["prefix"]}[0-9]+$'
+        ).order_by('pk').values_list('pk', flat=True))
+        self.options['users'] = len(self.user_ids)
+
+    def seed_groups(self, pool):
+        self.insert(pool, 'groups', Group, lambda row: Group(
+            title=row[0], slug=row[1], description=row[2]))
+        self.group_ids = [None] + list(Group.objects.filter(
+            slug__startswith=f'{self.options["prefix"]}-group-'
+        ).order_by('pk').values_list('pk', flat=True))
+        self.options['groups'] = len(self.group_ids) - 1
+
+    def seed_posts(self, pool):
+        self.insert(pool, 'posts', Post, lambda row: Post(
+            text=row[0], author_id=self.user_ids[row[1]],
+            group_id=self.group_ids[row[2]],
+            pub_date=self.now - timedelta(seconds=row[3]), image=row[4]))
+        self.post_ids = list(Post.objects.filter(
+            author_id__in=self.user_ids
+        ).order_by('pk').values_list('pk', flat=True))
+        self.options['posts'] = len(self.post_ids)
+
+    def seed_comments(self, pool):
+        self.insert(pool, 'comments', Comment, lambda row: Comment(
+            post_id=self.post_ids[row[0]], author_id=self.user_ids[row[1]],
+            text=row[2], created=self.now - timedelta(seconds=row[3])))
+
+    def seed_follows(self, pool):
+        self.insert(pool, 'follows', Follow, lambda row: Follow(
+            user_id=self.user_ids[row[0]],
+            author_id=self.user_ids[row[1]]))
+
+    def run(self):
+        pool = None
+        if self.workers > 1:
+            pool = multiprocessing.Pool(self.workers, initializer=django.setup)
+        try:
+            self.seed_users(pool)
+            self.seed_groups(pool)
+            with explicit_dates(Post._meta.get_field('pub_date'),
+                                Comment._meta.get_field('created')):
+                if self.options['users']:
+                    self.seed_posts(pool)
+                if self.options['users'] and self.options['posts']:
+                    self.seed_comments(pool)
+            if self.options['users'] > 1:
+                self.seed_follows(pool)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # bulk_create не вызывает сигналы: пересобираем производные данные.
+        counters.sync_all()
+        media.sync_references()
+        search.rebuild()
+        timeline.rebuild_all()
+        for prefix in (caching.INDEX_PAGE_CACHE_PREFIX,
+                       caching.GROUP_PAGE_CACHE_PREFIX,
+                       caching.PROFILE_PAGE_CACHE_PREFIX):
+            caching.bump_version(prefix)
@@ -0,0 +1,155 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, media, search, timeline
+from .caching import (
+    GROUP_PAGE_CACHE_PREFIX, INDEX_PAGE_CACHE_PREFIX,
+    PROFILE_PAGE_CACHE_PREFIX,
+    bump_stamp, bump_version
+)
+from .models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    if instance.image:
+        media.release(instance.image.name)
+
+
+@receiver(pre_save, sender=Post)
+def post_image_remember(sender, instance, raw, **kwargs):
+    instance.stored_image = ''
+    # Загрузка нужна acquire, если файл удалят до того, как его учтут.
+    instance.uploaded_image = (
+        None if instance.image._committed else instance.image.file)
+    if instance.pk is not None and not raw:
+        instance.stored_image = Post.objects.filter(
+            pk=instance.pk).values_list('image', flat=True).first() or ''
+
+
+@receiver(post_save, sender=Post)
+def post_image_saved(sender, instance, raw, **kwargs):
+    name = instance.image.name or ''
+    if raw or name == instance.stored_image:
+        return
+    if name:
+        media.acquire(name, instance.uploaded_image)
+    if instance.stored_image:
+        media.release(instance.stored_image)
+
+
+@receiver(post_save, sender=Post)
+def post_search_index(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_remove(sender, instance, **kwargs):
+    search.remove_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_search_index(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_search_remove(sender, instance, **kwargs):
+    search.remove_comment(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        counters.change_user(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        timeline.promote(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    counters.change_user(instance.user_id, 'following_count', -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.demote(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_index_page(sender, **kwargs):
+    bump_version(INDEX_PAGE_CACHE_PREFIX)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_page(sender, **kwargs):
+    bump_version(GROUP_PAGE_CACHE_PREFIX)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_profile_page(sender, **kwargs):
+    bump_version(PROFILE_PAGE_CACHE_PREFIX)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_stamp('post', instance.pk)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    bump_stamp('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, update_fields,
+                            **kwargs):
+    # Вход пользователя сохраняет только last_login.
+    if created or update_fields == frozenset(('last_login',)):
+        return
+    bump_stamp('author', instance.pk)
+    for prefix in (INDEX_PAGE_CACHE_PREFIX, GROUP_PAGE_CACHE_PREFIX,
+                   PROFILE_PAGE_CACHE_PREFIX):
+        bump_version(prefix)
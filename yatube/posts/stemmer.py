@@ -0,0 +1,90 @@
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:(?<=[ая])(?:в|вши|вшись)|(?:ив|ивши|ившись|ыв|ывши|ывшись))$')
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = (r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему'
+             r'|ому|их|ых|ую|юю|ая|яя|ою|ею)')
+PARTICIPLE = r'(?:(?<=[ая])(?:ем|нн|вш|ющ|щ)|(?:ивш|ывш|ующ))'
+ADJECTIVAL = re.compile(f'{PARTICIPLE}?{ADJECTIVE}$')
+VERB = re.compile(
+    r'(?:(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+    r'|(?:ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло'
+    r'|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$')
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием'
+    r'|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(?:ейше|ейш)$')
+
+WORD = re.compile(r'\w+')
+
+
+def regions(word: str):
+    '''Начала областей RV и R2 слова по правилам Snowball.'''
+    rv = r1 = r2 = len(word)
+    for index, letter in enumerate(word):
+        if letter in VOWELS:
+            rv = index + 1
+            break
+    for index in range(1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r1 = index + 1
+            break
+    for index in range(r1 + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            r2 = index + 1
+            break
+    return rv, r2
+
+
+def cut(pattern, word: str):
+    match = pattern.search(word)
+    if match is None:
+        return None
+    return word[:match.start()]
+
+
+def stem(word: str) -> str:
+    '''Основа русского слова по алгоритму Snowball (Портер).
+
+    Слова на других языках возвращаются в нижнем регистре без изменений.
+
+    '''
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    stemmed = cut(PERFECTIVE_GERUND, rv)
+    if stemmed is None:
+        rv = REFLEXIVE.sub('', rv, count=1)
+        for pattern in (ADJECTIVAL, VERB, NOUN):
+            stemmed = cut(pattern, rv)
+            if stemmed is not None:
+                break
+    if stemmed is not None:
+        rv = stemmed
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stemmed = cut(SUPERLATIVE, rv)
+        if stemmed is not None:
+            rv = stemmed[:-1] if stemmed.endswith('нн') else stemmed
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+    return prefix + rv
+
+
+def stem_words(text: str) -> list:
+    '''Основы всех слов текста по порядку.'''
+    return [stem(word) for word in WORD.findall(text)]
@@ -0,0 +1,51 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+
+from posts.caching import cache_skips, card_keys
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post.html'
+
+
+def card_variant(request) -> str:
+    '''В профиле карточка без автора, поэтому у неё свой вариант.'''
+    match = getattr(request, 'resolver_match', None)
+    if match is not None and match.view_name == 'posts:profile':
+        return 'profile'
+    return 'feed'
+
+
+def prefetch(context, post, variant):
+    '''Читает из кэша сразу все карточки текущей страницы.'''
+    posts = list(context.get('page_obj') or ())
+    if post not in posts:
+        posts = [post]
+    keys = card_keys(posts, variant)
+    cards = cache.get_many(keys.values())
+    return {pk: (key, cards.get(key)) for pk, key in keys.items()}
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    '''Карточка поста из includes/post.html, закэшированная по id поста.
+
+    Ключ зависит от меток поста, автора и группы, которые сигналы
+    меняют при правке поста, группы или имени автора.
+
+    '''
+    request = context.get('request')
+    variant = card_variant(request)
+    cards = context.render_context.setdefault('post_cards', {})
+    if post.pk not in cards:
+        cards.update(prefetch(context, post, variant))
+    key, card = cards[post.pk]
+    if card is None:
+        skips = cache_skips(request)
+        card = context.template.engine.get_template(CARD_TEMPLATE).render(
+            context.new({'post': post, 'request': request}))
+        if cache_skips(request) == skips:
+            cache.set(key, card, settings.POST_CARD_CACHE_SECONDS)
+    return mark_safe(card)
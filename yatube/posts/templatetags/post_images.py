@@ -0,0 +1,35 @@
+import logging
+
+from django import template
+
+from posts import thumbnails
+from posts.caching import skip_cache
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/picture.html', takes_context=True)
+def post_picture(context, image, name, css_class=''):
+    '''Картинка поста в нескольких ширинах и форматах.
+
+    Тег только читает готовые миниатюры из key-value хранилища и
+    никогда не строит их во время запроса.
+
+    '''
+    if not image:
+        return {}
+    try:
+        picture = thumbnails.picture(image, name, build=False)
+    except Exception:
+        logger.exception('Нет миниатюр %s для %s', name, image.name)
+        return {}
+    if picture is None:
+        picture = {'src': image.url}
+        if not thumbnails.failed(image):
+            # Миниатюры ещё строятся: оригинал показываем, но не кэшируем.
+            thumbnails.schedule(image)
+            skip_cache(context.get('request'))
+    picture['css_class'] = css_class
+    return picture
@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+from ..utils import EstimatedCountPaginator, estimated_count
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Тест')
+        cls.post = Post.objects.create(
+            author=cls.admin, text='Красивые кошки гуляли по крыше',
+            group=cls.group)
+        Post.objects.create(author=cls.admin, text='Про собак')
+        Comment.objects.create(
+            post=cls.post, author=cls.admin, text='А у меня кошка')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(AdminChangelistTests.admin)
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model._meta.model_name}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_rows(self):
+        '''Число запросов списка не зависит от числа строк.'''
+        for model in (Post, Comment):
+            with self.subTest(model=model.__name__):
+                before = self.changelist_queries(model)
+                for number in range(10):
+                    author = User.objects.create_user(
+                        username=f'{model.__name__}_{number}')
+                    group = Group.objects.create(
+                        title=f'{model.__name__} {number}',
+                        slug=f'{model.__name__}-{number}')
+                    post = Post.objects.create(
+                        author=author, text='Текст', group=group)
+                    Comment.objects.create(
+                        post=post, author=author, text='Текст')
+                self.assertEqual(self.changelist_queries(model), before)
+
+    def test_search_uses_full_text_index(self):
+        '''Поиск в админке находит записи по другой форме слова.'''
+        cases = (
+            (Post, 'кошка', [AdminChangelistTests.post.pk]),
+            (Comment, 'кошками',
+             list(Comment.objects.values_list('pk', flat=True))),
+            (Post, 'слон', []),
+        )
+        for model, query, expected in cases:
+            with self.subTest(model=model.__name__, query=query):
+                url = reverse(
+                    f'admin:posts_{model._meta.model_name}_changelist')
+                response = self.client.get(url, {'q': query})
+                found = [obj.pk for obj in response.context['cl'].result_list]
+                self.assertEqual(found, expected)
+
+
+class EstimatedCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {number}')
+            for number in range(5))
+
+    def test_estimated_count(self):
+        '''Оценка для SQLite — наибольший id таблицы.'''
+        self.assertEqual(estimated_count(Post),
+                         Post.objects.order_by('-pk').first().pk)
+
+    def test_paginator_count(self):
+        '''Точный подсчёт ограничен ADMIN_COUNT_LIMIT.'''
+        posts = Post.objects.order_by('-pk')
+        cases = (
+            (10, posts, 5),
+            (3, posts, estimated_count(Post)),
+            (3, posts.filter(text__startswith='Пост'), 3),
+        )
+        for limit, queryset, expected in cases:
+            with self.subTest(limit=limit, query=str(queryset.query)):
+                with override_settings(ADMIN_COUNT_LIMIT=limit):
+                    paginator = EstimatedCountPaginator(queryset, 2)
+                    self.assertEqual(paginator.count, expected)
@@ -0,0 +1,162 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Тест')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for number in range(settings.POSTS_PER_PAGE + 3):
+            cls.post = Post.objects.create(
+                author=cls.author, text=f'Пост {number}', group=cls.group)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiTests.reader)
+
+    def urls(self):
+        return (
+            reverse('api:index'),
+            reverse('api:group_list', args=(ApiTests.group.slug,)),
+            reverse('api:profile', args=(ApiTests.author.username,)),
+            reverse('api:follow_index'),
+        )
+
+    def test_feeds_are_paginated_by_cursor(self):
+        '''Ленты отдаются страницами по курсору без пропусков.'''
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+        for url in self.urls():
+            with self.subTest(url=url):
+                first = self.reader_client.get(url).json()
+                self.assertEqual(len(first['results']),
+                                 settings.POSTS_PER_PAGE)
+                self.assertIsNone(first['previous'])
+                second = self.reader_client.get(first['next']).json()
+                self.assertIsNone(second['next'])
+                found = [post['id']
+                         for post in first['results'] + second['results']]
+                self.assertEqual(found, expected)
+
+    def test_post_detail(self):
+        '''Пост отдаётся вместе с комментариями.'''
+        post = ApiTests.post
+        data = self.client.get(
+            reverse('api:post_detail', args=(post.pk,))).json()
+        self.assertEqual(data['id'], post.pk)
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'test_slug')
+        self.assertEqual([comment['text'] for comment in data['comments']],
+                         ['Комментарий'])
+
+    @override_settings(COMMENTS_PER_PAGE=2)
+    def test_post_comments_paginated(self):
+        '''Комментарии поста отдаются порциями по курсору.'''
+        post = ApiTests.post
+        for number in range(4):
+            Comment.objects.create(
+                post=post, author=ApiTests.author, text=f'Ответ {number}')
+        data = self.client.get(
+            reverse('api:post_detail', args=(post.pk,))).json()
+        texts = [comment['text'] for comment in data['comments']]
+        url = data['comments_next']
+        while url:
+            page = self.client.get(url).json()
+            texts.extend(comment['text'] for comment in page['results'])
+            url = page['next']
+        self.assertEqual(texts, ['Комментарий', 'Ответ 0', 'Ответ 1',
+                                 'Ответ 2', 'Ответ 3'])
+
+    def test_not_modified(self):
+        '''Неизменная лента отвечает 304, а новый пост меняет ETag.'''
+        urls = self.urls() + (
+            reverse('api:post_detail', args=(ApiTests.post.pk,)),)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertIn('Last-Modified', response)
+                etag = response['ETag']
+                self.assertFalse(etag.startswith('W/'))
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+
+        etags = {url: self.reader_client.get(url)['ETag'] for url in urls}
+        Comment.objects.create(
+            post=ApiTests.post, author=ApiTests.author, text='Ответ')
+        Post.objects.create(
+            author=ApiTests.author, text='Новый', group=ApiTests.group)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_edit_changes_etag(self):
+        '''Правка поста без новой даты тоже меняет ETag.'''
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        post = ApiTests.post
+        post.text = 'Исправленный текст'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['text'],
+                         'Исправленный текст')
+
+    def test_edit_and_delete_move_last_modified(self):
+        '''Правка и удаление поста сдвигают Last-Modified вперёд.'''
+        urls = self.urls()
+        post = ApiTests.post
+        post.text = 'Исправленный текст'
+        changes = (post.save, Post.objects.filter(pk=post.pk).delete)
+        for number, change in enumerate(changes, start=1):
+            modified = {url: self.reader_client.get(url)['Last-Modified']
+                        for url in urls}
+            later = timezone.now() + timedelta(minutes=number)
+            with mock.patch('posts.caching.timezone.now',
+                            return_value=later):
+                change()
+            for url in urls:
+                with self.subTest(url=url, change=number):
+                    response = self.reader_client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=modified[url])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_follow_requires_login(self):
+        '''Лента подписок без входа отвечает 401.'''
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_objects(self):
+        '''Несуществующие группа, автор и пост дают 404.'''
+        urls = (
+            reverse('api:group_list', args=('missing',)),
+            reverse('api:profile', args=('missing',)),
+            reverse('api:post_detail', args=(0,)),
+            reverse('api:post_comments', args=(0,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,98 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+
+from ..caching import bump_version, lock_key, versioned_cache_page
+
+CACHE_PREFIX = 'test_page'
+
+
+class VersionedCachePageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+
+        @versioned_cache_page(60, key_prefix=CACHE_PREFIX)
+        def view(request):
+            self.calls += 1
+            return HttpResponse(f'версия {self.calls}')
+
+        self.view = view
+
+    def tearDown(self):
+        cache.clear()
+
+    def get(self):
+        return self.view(self.factory.get('/page/')).content.decode()
+
+    def test_page_cached(self):
+        '''Повторный запрос отдаётся из кэша.'''
+        self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_version_bump_rebuilds_page(self):
+        '''После смены версии страница собирается заново.'''
+        self.get()
+        bump_version(CACHE_PREFIX)
+
+        self.assertEqual(self.get(), 'версия 2')
+
+    def test_stale_page_served_while_locked(self):
+        '''Пока другой процесс пересобирает страницу, отдаётся старая.'''
+        self.get()
+        request = self.factory.get('/page/')
+        cache.add(lock_key(request, f'{CACHE_PREFIX}.1'), 1, 1000)
+
+        with mock.patch('posts.caching.time.time',
+                        return_value=time.time() + 90):
+            self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_previous_version_served_while_locked(self):
+        '''После смены версии старая страница отдаётся на время сборки.'''
+        self.get()
+        bump_version(CACHE_PREFIX)
+        request = self.factory.get('/page/')
+        cache.add(lock_key(request, f'{CACHE_PREFIX}.2'), 1, 10)
+
+        self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_expired_page_rebuilt_once(self):
+        '''Просроченную страницу пересобирает тот, кто занял замок.'''
+        self.get()
+
+        with mock.patch('posts.caching.time.time',
+                        return_value=time.time() + 90):
+            self.assertEqual(self.get(), 'версия 2')
+        self.assertEqual(self.get(), 'версия 2')
+
+    def get_with_cookie(self, value):
+        request = self.factory.get('/page/', HTTP_COOKIE=f'sessionid={value}')
+        return self.view(request).content.decode()
+
+    def test_other_cookie_not_blocked(self):
+        '''Замок одной версии страницы не задерживает другие куки.'''
+        self.get_with_cookie('first')
+        request = self.factory.get('/page/', HTTP_COOKIE='sessionid=first')
+        cache.add(lock_key(request, f'{CACHE_PREFIX}.1'), 1, 10)
+
+        with mock.patch('posts.caching.time.sleep') as sleep:
+            self.assertEqual(self.get_with_cookie('second'), 'версия 2')
+        sleep.assert_not_called()
+
+    def test_wait_ends_with_lock(self):
+        '''Ожидание заканчивается, как только замок снят.'''
+        lock = lock_key(self.factory.get('/page/'), f'{CACHE_PREFIX}.1')
+        cache.add(lock, 1, 10)
+
+        with mock.patch('posts.caching.time.sleep',
+                        side_effect=lambda seconds: cache.delete(lock)
+                        ) as sleep:
+            self.assertEqual(self.get(), 'версия 1')
+        self.assertEqual(sleep.call_count, 1)
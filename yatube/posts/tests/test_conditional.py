@@ -0,0 +1,130 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..caching import (
+    GROUP_PAGE_CACHE_PREFIX, INDEX_PAGE_CACHE_PREFIX,
+    PROFILE_PAGE_CACHE_PREFIX,
+    changed_key, version_key
+)
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Тест')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group_list',
+                    args=(ConditionalGetTests.group.slug,)),
+            reverse('posts:profile',
+                    args=(ConditionalGetTests.author.username,)),
+            reverse('posts:post_detail', args=(ConditionalGetTests.post.pk,)),
+        )
+
+    def clear_pages(self):
+        '''Очищает кэш страниц, сохраняя версии и время их смены.'''
+        keys = [key(prefix) for key in (changed_key, version_key)
+                for prefix in (INDEX_PAGE_CACHE_PREFIX,
+                               GROUP_PAGE_CACHE_PREFIX,
+                               PROFILE_PAGE_CACHE_PREFIX)]
+        state = cache.get_many(keys)
+        cache.clear()
+        cache.set_many(state, None)
+
+    def test_not_modified_without_rendering(self):
+        '''Повторный запрос с ETag получает 304 без сборки страницы.'''
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('Last-Modified', response)
+                self.clear_pages()
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertNotIn('posts_post.text', ' '.join(
+                    query['sql'] for query in queries))
+                self.assertLessEqual(len(queries), 1)
+
+    def test_etag_depends_on_user(self):
+        '''Гость и вошедший пользователь получают разные ETag.'''
+        for url in self.urls():
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def assert_changed(self, urls, change):
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        change()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_edit_invalidates_etag(self):
+        '''Правка поста меняет ETag всех страниц с ним.'''
+        post = Post.objects.get(pk=ConditionalGetTests.post.pk)
+        post.text = 'Исправленный пост'
+        self.assert_changed(self.urls(), post.save)
+
+    def test_comment_invalidates_etag(self):
+        '''Новый комментарий меняет ETag страницы поста.'''
+        post = ConditionalGetTests.post
+        self.assert_changed(
+            (reverse('posts:post_detail', args=(post.pk,)),),
+            lambda: Comment.objects.create(
+                post=post, author=ConditionalGetTests.reader, text='Ответ'))
+
+    def test_edit_and_delete_move_last_modified(self):
+        '''Правка поста и удаление комментария и поста не дают 304
+        по одному If-Modified-Since.'''
+        post = Post.objects.get(pk=ConditionalGetTests.post.pk)
+        post.text = 'Исправленный пост'
+        comment = Comment.objects.create(
+            post=post, author=ConditionalGetTests.reader, text='Ответ')
+        other = Post.objects.create(
+            author=ConditionalGetTests.author, text='Новый пост',
+            group=ConditionalGetTests.group)
+        detail = (reverse('posts:post_detail', args=(post.pk,)),)
+        changes = ((post.save, self.urls()), (comment.delete, detail),
+                   (other.delete, self.urls()))
+        for number, (change, urls) in enumerate(changes, start=1):
+            modified = {url: self.guest_client.get(url)['Last-Modified']
+                        for url in urls}
+            later = timezone.now() + timedelta(minutes=number)
+            with mock.patch('posts.caching.timezone.now',
+                            return_value=later):
+                change()
+            for url in urls:
+                with self.subTest(url=url, change=number):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_MODIFIED_SINCE=modified[url])
+                    self.assertEqual(response.status_code, 200)
@@ -0,0 +1,66 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def test_posts_count(self):
+        '''Счётчик постов меняется при создании и удалении поста.'''
+        post = Post.objects.create(author=CountersTests.author, text='Ещё')
+        counters = UserCounters.objects.get(user=CountersTests.author)
+        self.assertEqual(counters.posts_count, 2)
+
+        post.delete()
+        counters.refresh_from_db()
+        self.assertEqual(counters.posts_count, 1)
+
+    def test_comments_count(self):
+        '''Счётчик комментариев поста меняется вместе с комментариями.'''
+        comment = Comment.objects.create(
+            post=CountersTests.post, author=CountersTests.reader, text='Да')
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+
+        comment.delete()
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 0)
+
+    def test_follow_counts(self):
+        '''Подписка меняет счётчики подписчиков и подписок.'''
+        follow = Follow.objects.create(
+            user=CountersTests.reader, author=CountersTests.author)
+        author_counters = UserCounters.objects.get(user=CountersTests.author)
+        reader_counters = UserCounters.objects.get(user=CountersTests.reader)
+        self.assertEqual(author_counters.followers_count, 1)
+        self.assertEqual(reader_counters.following_count, 1)
+
+        follow.delete()
+        author_counters.refresh_from_db()
+        self.assertEqual(author_counters.followers_count, 0)
+
+    def test_sync_counters_command(self):
+        '''Команда sync_counters восстанавливает счётчики по данным.'''
+        Comment.objects.create(
+            post=CountersTests.post, author=CountersTests.reader, text='Да')
+        UserCounters.objects.all().delete()
+        Post.objects.update(comments_count=0)
+
+        call_command('sync_counters', stdout=StringIO())
+
+        CountersTests.post.refresh_from_db()
+        self.assertEqual(CountersTests.post.comments_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=CountersTests.author).posts_count, 1)
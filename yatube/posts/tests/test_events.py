@@ -0,0 +1,201 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import events
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+def run_on_commit(func):
+    func()
+
+
+def payloads(messages):
+    return [(event, data) for _, _, event, data in messages]
+
+
+class BrokerTests(TestCase):
+    def check_broker(self, broker):
+        subscription = broker.subscribe(['index', 'group.1'])
+        other = broker.subscribe(['group.2'])
+        broker.publish('index', 'post', {'id': 1})
+        broker.publish('group.2', 'post', {'id': 2})
+        broker.publish('group.1', 'post', {'id': 3})
+
+        self.assertEqual(payloads(subscription.get(0.1)),
+                         [('post', {'id': 1}), ('post', {'id': 3})])
+        self.assertEqual(subscription.get(0.01), [])
+        self.assertEqual(payloads(other.get(0.1)), [('post', {'id': 2})])
+        subscription.close()
+        other.close()
+
+    def check_resume(self, broker):
+        subscription = broker.subscribe(['index', 'group.1'])
+        broker.publish('index', 'post', {'id': 1})
+        positions = dict(subscription.positions)
+        for channel, number, _, _ in subscription.get(0.1):
+            positions[channel] = number
+        subscription.close()
+        broker.publish('index', 'post', {'id': 2})
+        broker.publish('group.1', 'post', {'id': 3})
+
+        resumed = broker.subscribe(['index', 'group.1'], positions)
+        self.assertEqual(payloads(resumed.get(0.1)),
+                         [('post', {'id': 2}), ('post', {'id': 3})])
+        resumed.close()
+
+    def test_local_broker(self):
+        '''LocalBroker раздаёт события подписчикам своих каналов.'''
+        broker = events.LocalBroker()
+        self.check_broker(broker)
+        self.assertEqual(broker.subscriptions, {})
+
+    def test_local_broker_resume(self):
+        '''LocalBroker досылает события, пропущенные между подписками.'''
+        self.check_resume(events.LocalBroker())
+
+    @override_settings(EVENTS_POLL_SECONDS=0.01)
+    def test_cache_broker_resume(self):
+        '''CacheBroker досылает события, пропущенные между подписками.'''
+        cache.clear()
+        self.check_resume(events.CacheBroker())
+
+    @override_settings(EVENTS_POLL_SECONDS=0.01)
+    def test_cache_broker(self):
+        '''CacheBroker передаёт события через кэш.'''
+        self.check_broker(events.CacheBroker())
+
+    @override_settings(EVENTS_QUEUE_SIZE=2)
+    def test_slow_subscriber_drops_events(self):
+        '''Переполненная очередь подписчика не мешает публикации.'''
+        broker = events.LocalBroker()
+        subscription = broker.subscribe(['index'])
+        for number in range(5):
+            broker.publish('index', 'post', {'id': number})
+        self.assertEqual(len(subscription.get(0.1)), 2)
+
+
+@override_settings(EVENTS_ENABLED=True,
+                   EVENTS_BACKEND='posts.events.LocalBroker',
+                   EVENTS_HEARTBEAT_SECONDS=0.01)
+class EventStreamTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Тест')
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(EventStreamTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(EventStreamTests.reader)
+        patcher = mock.patch.object(
+            events.transaction, 'on_commit', run_on_commit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def open_stream(self, url):
+        response = self.reader_client.get(url)
+        self.addCleanup(response.close)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return iter(response.streaming_content)
+
+    def next_event(self, stream, with_id=False):
+        for chunk in stream:
+            fields = dict(line.split(': ', 1)
+                          for line in chunk.decode().strip().split('\n'))
+            if 'event' in fields:
+                event = fields['event'], json.loads(fields['data'])
+                return event + (fields['id'],) if with_id else event
+        return None
+
+    def test_new_post_reaches_feeds(self):
+        '''Новый пост приходит в потоки главной, группы и подписок.'''
+        group = EventStreamTests.group
+        streams = [self.open_stream(reverse(name, args=args)) for name, args
+                   in (('posts:index_events', ()),
+                       ('posts:group_events', (group.slug,)),
+                       ('posts:follow_events', ()))]
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост', 'group': group.pk})
+        post = Post.objects.get(text='Новый пост')
+        for stream in streams:
+            with self.subTest(stream=stream):
+                self.assertEqual(self.next_event(stream), ('post', {
+                    'id': post.pk, 'author': 'author', 'group': 'test_slug'}))
+
+    def test_new_comment_reaches_post(self):
+        '''Новый комментарий приходит в поток своего поста.'''
+        post = EventStreamTests.post
+        stream = self.open_stream(reverse('posts:post_events',
+                                          args=(post.pk,)))
+        other_stream = self.open_stream(reverse('posts:index_events'))
+        self.author_client.post(reverse('posts:add_comment', args=(post.pk,)),
+                                {'text': 'Комментарий'})
+        event, data = self.next_event(stream)
+        self.assertEqual((event, data['post'], data['text']),
+                         ('comment', post.pk, 'Комментарий'))
+        self.assertEqual(next(other_stream).decode()[:6], 'retry:')
+        self.assertEqual(next(other_stream), b': ping\n\n')
+
+    def test_reconnect_gets_missed_events(self):
+        '''После переподключения с Last-Event-ID приходят пропущенные
+        события.'''
+        url = reverse('posts:index_events')
+        stream = self.open_stream(url)
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Первый пост'})
+        _, _, event_id = self.next_event(stream, with_id=True)
+
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Пост без подписчиков'})
+        response = self.reader_client.get(url, HTTP_LAST_EVENT_ID=event_id)
+        self.addCleanup(response.close)
+
+        event, data = self.next_event(iter(response.streaming_content))
+        self.assertEqual(data['id'],
+                         Post.objects.get(text='Пост без подписчиков').pk)
+
+    def test_stream_ends(self):
+        '''Поток закрывается через EVENTS_STREAM_SECONDS.'''
+        with self.settings(EVENTS_STREAM_SECONDS=0.05):
+            chunks = list(self.open_stream(reverse('posts:index_events')))
+        self.assertIsNone(self.next_event(iter(chunks)))
+        self.assertGreater(len(chunks), 1)
+
+    def test_missing_objects(self):
+        '''Поток несуществующей группы или поста отвечает 404.'''
+        for url in (reverse('posts:group_events', args=('missing',)),
+                    reverse('posts:post_events', args=(0,))):
+            with self.subTest(url=url):
+                self.assertEqual(self.reader_client.get(url).status_code, 404)
+
+    def test_disabled(self):
+        '''Без EVENTS_ENABLED страницы не открывают потоки, а адреса
+        потоков отвечают 204, чтобы браузер не переподключался.'''
+        post = EventStreamTests.post
+        self.assertContains(
+            self.reader_client.get(reverse('posts:index')), 'EventSource')
+        cache.clear()
+        with self.settings(EVENTS_ENABLED=False):
+            for url in (reverse('posts:index'),
+                        reverse('posts:post_detail', args=(post.pk,))):
+                with self.subTest(url=url):
+                    self.assertNotContains(
+                        self.reader_client.get(url), 'EventSource')
+            for url in (reverse('posts:index_events'),
+                        reverse('posts:post_events', args=(post.pk,))):
+                with self.subTest(url=url):
+                    self.assertEqual(
+                        self.reader_client.get(url).status_code, 204)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -108,8 +109,9 @@ class PostFormTests(TestCase):
             ).exists()
         )
         newpost = Post.objects.get(text='Текст поста с картинкой')
-        filename = UPLOAD_DIR + uploaded.name
-        self.assertIn(filename, newpost.image.name)
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(newpost.image.name,
+                         f'{UPLOAD_DIR}{digest[:2]}/{digest}.gif')
 
     def test_edit_post(self):
         '''Валидная форма изменяет запись в Post.'''
@@ -0,0 +1,72 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Group, Post, TimelineEntry
+from ..utils import CURSOR_NEXT, CURSOR_PREVIOUS, CursorPaginator
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class FeedIndexesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return ' | '.join(row[-1] for row in cursor.fetchall())
+
+    def page_querysets(self, queryset, **kwargs):
+        '''Запросы для первой, следующей и предыдущей страниц ленты.'''
+        paginator = CursorPaginator(
+            queryset, settings.POSTS_PER_PAGE, **kwargs)
+        now = timezone.now()
+        for position in (None, (CURSOR_NEXT, now, 1),
+                         (CURSOR_PREVIOUS, now, 1)):
+            yield paginator.page_queryset(queryset, position)
+
+    def assert_index_scan(self, queryset, index_name, **kwargs):
+        for page_queryset in self.page_querysets(queryset, **kwargs):
+            plan = self.explain(page_queryset)
+            with self.subTest(plan=plan):
+                self.assertIn(index_name, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_index_feed_uses_index(self):
+        '''Главная лента читается по индексу без сортировки.'''
+        self.assert_index_scan(Post.objects.all(), 'post_pub_date')
+
+    def test_group_feed_uses_index(self):
+        '''Лента группы читается по индексу без сортировки.'''
+        self.assert_index_scan(
+            FeedIndexesTests.group.posts.all(), 'post_group_pub_date')
+
+    def test_profile_feed_uses_index(self):
+        '''Лента автора читается по индексу без сортировки.'''
+        self.assert_index_scan(
+            FeedIndexesTests.user.posts.all(), 'post_author_pub_date')
+
+    def test_follow_feed_uses_index(self):
+        '''Лента подписок читается по индексу без сортировки.'''
+        self.assert_index_scan(
+            TimelineEntry.objects.filter(user=FeedIndexesTests.user),
+            'timeline_user_pub_date_post', key='post_id')
+
+    def test_comments_use_index(self):
+        '''Комментарии поста читаются по индексу без сортировки.'''
+        plan = self.explain(
+            Comment.objects.filter(post_id=1).order_by('created', 'pk')[:10])
+
+        self.assertIn('comment_post_created', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+
+from .. import thumbnails
+from ..kvstore import LRU, KVStore, database_path
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class KVStoreTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Индекс миниатюр общий для прогонов, а MEDIA_ROOT временный.
+        default.kvstore.clear()
+
+    def test_values_persist(self):
+        '''Значения переживают пересоздание хранилища.'''
+        store = KVStore()
+        store._set_raw('sorl-thumbnail||image||a', 'значение')
+        store._set_raw('sorl-thumbnail||image||b', 'другое')
+        store._delete_raw('sorl-thumbnail||image||b')
+
+        reopened = KVStore()
+        self.assertEqual(
+            reopened._get_raw('sorl-thumbnail||image||a'), 'значение')
+        self.assertIsNone(reopened._get_raw('sorl-thumbnail||image||b'))
+        self.assertEqual(reopened._find_keys_raw('sorl-thumbnail||image'),
+                         ['sorl-thumbnail||image||a'])
+
+    def test_lru_front(self):
+        '''Повторное чтение обслуживается LRU без обращения к файлу.'''
+        store = KVStore()
+        store._set_raw('key', 'value')
+        store.local.connection = mock.Mock()
+
+        self.assertEqual(store._get_raw('key'), 'value')
+        store.local.connection.execute.assert_not_called()
+
+    @override_settings(THUMBNAIL_KVSTORE_PATH=None)
+    def test_default_path_outside_media(self):
+        '''По умолчанию файл хранилища лежит вне MEDIA_ROOT.'''
+        path = database_path()
+
+        self.assertEqual(os.path.commonpath([path, settings.BASE_DIR]),
+                         settings.BASE_DIR)
+        self.assertNotEqual(
+            os.path.commonpath([path, settings.MEDIA_ROOT]),
+            settings.MEDIA_ROOT)
+
+    def test_lru_eviction(self):
+        '''LRU вытесняет давно не использованные ключи.'''
+        lru = LRU(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailWarmupTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Индекс миниатюр общий для прогонов, а MEDIA_ROOT временный.
+        default.kvstore.clear()
+
+    def test_warmup_builds_recent_thumbnails(self):
+        '''thumbnail_warmup строит миниатюры картинок последних постов.'''
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(
+            author=author, text='Пост', image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF,
+                content_type='image/gif'))
+
+        call_command('thumbnail_warmup', posts=5, stdout=StringIO())
+
+        with mock.patch.object(default, 'engine') as engine:
+            thumbnails.picture(post.image, 'card')
+        engine.get_image.assert_not_called()
@@ -0,0 +1,139 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+
+from .. import media
+from ..models import Post, StoredImage
+from ..storage import ContentAddressedStorage
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+OTHER_GIF = SMALL_GIF[:-3] + b'\x0B\x00\x3B'
+
+
+def uploaded_gif(content=SMALL_GIF, name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=content, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(
+            author=ContentAddressedMediaTests.author, text='Пост',
+            image=image)
+
+    def references(self, name):
+        return StoredImage.objects.get(name=name).references
+
+    def test_same_content_stored_once(self):
+        '''Одинаковые картинки разных постов хранятся в одном файле.'''
+        first = self.create_post(uploaded_gif(name='first.gif'))
+        second = self.create_post(uploaded_gif(name='second.gif'))
+
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(self.references(first.image.name), 2)
+
+    def test_file_deleted_without_references(self):
+        '''Файл удаляется, когда на него не остаётся ссылок.'''
+        first = self.create_post(uploaded_gif())
+        second = self.create_post(uploaded_gif())
+        name = first.image.name
+        storage = first.image.storage
+
+        first.delete()
+        media.collect(name)
+        self.assertEqual(self.references(name), 1)
+        self.assertTrue(storage.exists(name))
+
+        second.delete()
+        media.collect(name)
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_replaced_image_released(self):
+        '''Замена картинки поста снимает ссылку со старого файла.'''
+        post = self.create_post(uploaded_gif())
+        old_name = post.image.name
+
+        post.image = uploaded_gif(OTHER_GIF)
+        post.save()
+
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertEqual(self.references(old_name), 0)
+        self.assertEqual(self.references(post.image.name), 1)
+
+    def test_sync_references(self):
+        '''sync_references пересчитывает ссылки по постам.'''
+        post = self.create_post(uploaded_gif())
+        StoredImage.objects.all().delete()
+
+        media.sync_references()
+
+        self.assertEqual(self.references(post.image.name), 1)
+
+    def test_acquire_retries_parallel_create(self):
+        '''acquire прибавляет ссылку, если строку успел создать другой.'''
+        name = self.create_post(uploaded_gif()).image.name
+        update = QuerySet.update
+        calls = []
+
+        def racing_update(queryset, **kwargs):
+            # Первый update не видит строку, как будто её ещё не создали.
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', racing_update):
+            media.acquire(name)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.references(name), 2)
+
+    def test_acquire_restores_collected_file(self):
+        '''Файл, удалённый между storage.save и acquire, пишется заново.'''
+        save = ContentAddressedStorage.save
+
+        def save_then_collect(storage, name, content, max_length=None):
+            name = save(storage, name, content, max_length=max_length)
+            StoredImage.objects.filter(name=name).update(references=0)
+            media.collect(name)
+            return name
+
+        self.create_post(uploaded_gif())
+        with mock.patch.object(
+                ContentAddressedStorage, 'save', save_then_collect):
+            post = self.create_post(uploaded_gif())
+
+        self.assertEqual(self.references(post.image.name), 1)
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        post.image.open()
+        self.assertEqual(post.image.read(), SMALL_GIF)
+        post.image.close()
@@ -0,0 +1,79 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase
+
+from .. import caching
+from ..models import Group, Post
+
+User = get_user_model()
+
+CARDS = Template(
+    '{% load post_cards %}'
+    '{% for post in page_obj %}{% post_card post %}{% endfor %}'
+)
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_slug', description='Тест')
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}',
+                                group=cls.group)
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self):
+        posts = list(Post.objects.select_related('author', 'group'))
+        return CARDS.render(Context({'page_obj': posts}))
+
+    def test_cards_cached(self):
+        '''Карточки берутся из кэша, пока пост не сохранён заново.'''
+        post = PostCardCacheTests.posts[0]
+        self.assertIn('Пост 0', self.render())
+        Post.objects.filter(pk=post.pk).update(text='Тихая правка')
+        self.assertIn('Пост 0', self.render())
+
+        post.text = 'Новый текст'
+        post.save()
+        self.assertIn('Новый текст', self.render())
+
+    def test_page_read_with_two_lookups(self):
+        '''Метки постов и затем их карточки читаются двумя get_many.'''
+        with mock.patch.object(caching.cache, 'get_many',
+                               wraps=caching.cache.get_many) as get_many:
+            self.render()
+        self.assertEqual(get_many.call_count, 2)
+
+    def test_author_name_change(self):
+        '''Смена имени автора сбрасывает его карточки, а вход — нет.'''
+        author = User.objects.get(pk=PostCardCacheTests.author.pk)
+        self.render()
+        author.last_name = 'Достоевский'
+        author.save(update_fields=['last_login'])
+        self.assertNotIn('Достоевский', self.render())
+
+        author.save()
+        self.assertIn('Лев Достоевский', self.render())
+
+    def test_group_change(self):
+        '''Правка группы меняет ключи карточек её постов.'''
+        posts = PostCardCacheTests.posts
+        keys = caching.card_keys(posts, 'feed')
+        self.assertEqual(caching.card_keys(posts, 'feed'), keys)
+
+        PostCardCacheTests.group.save()
+        new_keys = caching.card_keys(posts, 'feed')
+        for post in posts:
+            with self.subTest(post=post.pk):
+                self.assertNotEqual(new_keys[post.pk], keys[post.pk])
@@ -0,0 +1,168 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+
+from .. import thumbnails, timeline
+from ..models import Comment, Follow, Group, Post
+from ..api_urls import urlpatterns as api_urlpatterns
+from ..urls import urlpatterns
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.readers = [User.objects.create_user(username=f'reader_{number}')
+                       for number in range(3)]
+        cls.author = User.objects.create_user(username='author')
+        cls.other_author = User.objects.create_user(username='other_author')
+        for reader in cls.readers:
+            Follow.objects.create(user=reader, author=cls.author)
+
+        for number in range(settings.POSTS_PER_PAGE + 2):
+            post = Post.objects.create(
+                author=cls.author,
+                text=f'Пост {number}',
+                group=cls.group,
+                image=SimpleUploadedFile(
+                    name='small.gif', content=SMALL_GIF,
+                    content_type='image/gif'),
+            )
+        cls.post = post
+        for reader in cls.readers:
+            Comment.objects.create(
+                post=cls.post, author=reader, text='Комментарий')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Индекс миниатюр общий для прогонов, а MEDIA_ROOT временный.
+        default.kvstore.clear()
+        # Миниатюры строятся при загрузке картинки, а не при показе.
+        for post in Post.objects.all():
+            thumbnails.generate(post.image)
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryBudgetTests.readers[0])
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTests.author)
+
+    def test_all_views_have_budget(self):
+        '''У каждой страницы posts объявлен бюджет запросов.'''
+        for pattern in urlpatterns + api_urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_views_fit_budget(self):
+        '''Страницы укладываются в объявленный бюджет запросов.'''
+        post = QueryBudgetTests.post
+        author = QueryBudgetTests.author.username
+        requests = (
+            (self.guest_client, 'get', reverse('posts:index')),
+            (self.reader_client, 'get', reverse('posts:index')),
+            (self.guest_client, 'get',
+             reverse('posts:group_list', args=(QueryBudgetTests.group.slug,))),
+            (self.reader_client, 'get',
+             reverse('posts:group_list', args=(QueryBudgetTests.group.slug,))),
+            (self.guest_client, 'get', reverse('posts:profile',
+                                               args=(author,))),
+            (self.reader_client, 'get', reverse('posts:profile',
+                                                args=(author,))),
+            (self.reader_client, 'get',
+             reverse('posts:post_detail', args=(post.pk,))),
+            (self.reader_client, 'get', reverse('posts:follow_index')),
+            (self.guest_client, 'get', reverse('api:index')),
+            (self.guest_client, 'get',
+             reverse('api:group_list', args=(QueryBudgetTests.group.slug,))),
+            (self.guest_client, 'get', reverse('api:profile',
+                                               args=(author,))),
+            (self.guest_client, 'get',
+             reverse('api:post_detail', args=(post.pk,))),
+            (self.reader_client, 'get', reverse('api:follow_index')),
+            (self.guest_client, 'get',
+             reverse('api:post_comments', args=(post.pk,))),
+            (self.guest_client, 'get',
+             reverse('posts:post_comments', args=(post.pk,))),
+            (self.guest_client, 'get', reverse('posts:index_events')),
+            (self.guest_client, 'get',
+             reverse('posts:group_events',
+                     args=(QueryBudgetTests.group.slug,))),
+            (self.reader_client, 'get', reverse('posts:follow_events')),
+            (self.guest_client, 'get',
+             reverse('posts:post_events', args=(post.pk,))),
+            (self.guest_client, 'get', reverse('posts:search') + '?q=Пост'),
+            (self.reader_client, 'get', reverse('posts:search') + '?q=Пост'),
+            (self.author_client, 'get', reverse('posts:post_create')),
+            (self.author_client, 'get',
+             reverse('posts:post_edit', args=(post.pk,))),
+            (self.author_client, 'post',
+             reverse('posts:post_edit', args=(post.pk,))),
+            (self.reader_client, 'post',
+             reverse('posts:add_comment', args=(post.pk,))),
+            (self.author_client, 'post', reverse('posts:post_create')),
+            (self.reader_client, 'get',
+             reverse('posts:profile_follow',
+                     args=(QueryBudgetTests.other_author.username,))),
+            (self.reader_client, 'get',
+             reverse('posts:profile_unfollow',
+                     args=(QueryBudgetTests.other_author.username,))),
+        )
+        for client, method, url in requests:
+            with self.subTest(method=method, url=url):
+                data = {'text': 'Новый текст'} if method == 'post' else {}
+                getattr(client, method)(url, data).close()
+
+    def test_image_upload_fits_budget(self):
+        '''Создание и правка поста с картинкой укладываются в бюджет.'''
+        post = QueryBudgetTests.post
+        for url in (reverse('posts:post_create'),
+                    reverse('posts:post_edit', args=(post.pk,))):
+            with self.subTest(url=url):
+                self.author_client.post(url, {
+                    'text': 'Пост с картинкой',
+                    'image': SimpleUploadedFile(
+                        name='new.gif', content=SMALL_GIF,
+                        content_type='image/gif'),
+                }).close()
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=0)
+    def test_celebrity_feed_fits_budget(self):
+        '''Лента с постами популярного автора укладывается в бюджет.'''
+        for url in (reverse('posts:follow_index'),
+                    reverse('api:follow_index')):
+            with self.subTest(url=url):
+                timeline.rebuild_all()
+                cache.clear()
+                # Список популярных авторов обычно уже лежит в кэше.
+                timeline.celebrities()
+                self.reader_client.get(url).close()
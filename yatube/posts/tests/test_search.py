@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+from ..stemmer import stem
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_stem(self):
+        '''Разные формы слова сводятся к одной основе.'''
+        cases = {
+            'кошки': 'кошк',
+            'кошками': 'кошк',
+            'красивейшая': 'красив',
+            'гуляли': 'гуля',
+            'программирование': 'программирован',
+            'Ёлками': 'елк',
+            'python': 'python',
+        }
+        for word, expected in cases.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Красивые кошки гуляли по крыше')
+        cls.other_post = Post.objects.create(
+            author=cls.author, text='Про собак')
+        Comment.objects.create(
+            post=cls.other_post, author=cls.author, text='А у меня кошка')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_by_word_form(self):
+        '''Пост находится по другой форме слова.'''
+        self.assertEqual(self.found('крыша'), [SearchTests.post])
+
+    def test_post_text_ranked_above_comment(self):
+        '''Совпадение в тексте поста выше совпадения в комментарии.'''
+        self.assertEqual(self.found('кошкой'),
+                         [SearchTests.post, SearchTests.other_post])
+
+    def test_index_follows_changes(self):
+        '''Индекс обновляется при изменении и удалении постов.'''
+        post = Post.objects.create(
+            author=SearchTests.author, text='Старый текст')
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.found('старый'), [])
+        self.assertEqual(self.found('новые'), [post])
+
+        post.delete()
+        self.assertEqual(self.found('новые'), [])
+
+    def test_comment_delete_removes_match(self):
+        '''Удалённый комментарий больше не находится.'''
+        Comment.objects.filter(text='А у меня кошка').delete()
+        self.assertEqual(self.found('кошка'), [SearchTests.post])
+
+    def test_empty_query(self):
+        '''Пустой запрос или запрос из знаков не ищет ничего.'''
+        self.assertEqual(self.found(''), [])
+        self.assertEqual(self.found('"*"'), [])
+
+    def test_keyset_pagination(self):
+        '''Страницы результатов идут по курсору без пропусков и повторов.'''
+        posts = {Post.objects.create(author=SearchTests.author,
+                                     text=f'Пагинация номер {number}')
+                 for number in range(13)}
+        paginator = search.SearchPaginator('пагинация', 10)
+        first = paginator.get_page(None)
+        self.assertEqual(len(first), 10)
+        self.assertTrue(first.has_next())
+
+        second = search.SearchPaginator('пагинация', 10).get_page(
+            paginator.next_cursor)
+        self.assertEqual(len(second), 3)
+        self.assertFalse(second.has_next())
+        self.assertEqual(
+            {hit.post_id for hit in [*first, *second]},
+            {post.pk for post in posts})
+
+        back = search.SearchPaginator('пагинация', 10).get_page(
+            second.paginator.previous_cursor)
+        self.assertEqual(list(back), list(first))
+
+    def test_rebuild(self):
+        '''rebuild восстанавливает индекс по данным.'''
+        search.backend().remove(search.POST, SearchTests.post.pk)
+        self.assertEqual(self.found('крыша'), [])
+
+        search.rebuild()
+        self.assertEqual(self.found('крыша'), [SearchTests.post])
@@ -0,0 +1,88 @@
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserCounters
+from ..seeding import explicit_dates
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+NOW = timezone.make_aware(datetime(2024, 1, 1, 12))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed_creates_objects(self):
+        '''Команда создаёт заданное число объектов и пересчитывает данные.'''
+        call_command('seed_yatube', users=5, groups=2, posts=12, comments=7,
+                     follows=6, batch_size=4, images=0.5,
+                     image_size=(16, 16), stdout=StringIO())
+
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 12)
+        self.assertEqual(Comment.objects.count(), 7)
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        self.assertEqual(
+            sum(UserCounters.objects.values_list('posts_count', flat=True)),
+            12)
+        self.assertEqual(
+            TimelineEntry.objects.count(),
+            sum(Post.objects.filter(author=follow.author).count()
+                for follow in Follow.objects.all()))
+
+    def seeded_rows(self, **options):
+        call_command('seed_yatube', users=6, groups=2, posts=15,
+                     comments=9, follows=8, seed=42, images=0,
+                     stdout=StringIO(), **options)
+        rows = {
+            'users': User.objects.values_list(
+                'username', 'first_name', 'last_name'),
+            'groups': Group.objects.values_list(
+                'slug', 'title', 'description'),
+            'posts': Post.objects.values_list(
+                'author__username', 'group__slug', 'text', 'pub_date'),
+            'comments': Comment.objects.values_list(
+                'post__text', 'author__username', 'text', 'created'),
+            'follows': Follow.objects.values_list(
+                'user__username', 'author__username'),
+        }
+        return {kind: sorted(values, key=str)
+                for kind, values in rows.items()}
+
+    def test_seed_is_deterministic(self):
+        '''Одно зерно даёт те же строки при любых процессах и пачках.'''
+        with mock.patch('posts.seeding.timezone.now', return_value=NOW):
+            first = self.seeded_rows(workers=1, batch_size=4)
+            User.objects.all().delete()
+            Group.objects.all().delete()
+            second = self.seeded_rows(workers=2, batch_size=5)
+
+        self.assertEqual(len(first['posts']), 15)
+        self.assertEqual(first, second)
+
+    def test_explicit_dates_restored_on_error(self):
+        '''После исключения explicit_dates возвращает auto_now_add.'''
+        field = Post._meta.get_field('pub_date')
+
+        with self.assertRaises(ValueError):
+            with explicit_dates(field):
+                self.assertFalse(field.auto_now_add)
+                raise ValueError
+
+        self.assertTrue(field.auto_now_add)
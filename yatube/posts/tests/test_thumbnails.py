@@ -0,0 +1,193 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .. import thumbnails
+from ..caching import (
+    GROUP_PAGE_CACHE_PREFIX, INDEX_PAGE_CACHE_PREFIX,
+    PROFILE_PAGE_CACHE_PREFIX,
+    get_version
+)
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+PAGE_PREFIXES = (INDEX_PAGE_CACHE_PREFIX, GROUP_PAGE_CACHE_PREFIX,
+                 PROFILE_PAGE_CACHE_PREFIX)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded_gif(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+def unique_png(color):
+    '''Картинка со своим содержимым, а значит и своим именем в хранилище.'''
+    output = BytesIO()
+    Image.new('RGB', (4, 2), color).save(output, 'PNG')
+    return SimpleUploadedFile(
+        name='unique.png', content=output.getvalue(),
+        content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        # Индекс миниатюр общий для прогонов, а MEDIA_ROOT временный.
+        default.kvstore.clear()
+        self.author_client = Client()
+        self.author_client.force_login(ThumbnailsTests.author)
+
+    def test_pages_read_prebuilt_thumbnails(self):
+        '''Страница с готовыми миниатюрами не вызывает Pillow.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост', image=uploaded_gif())
+        thumbnails.generate(post.image)
+
+        with mock.patch.object(default, 'engine') as engine:
+            response = self.author_client.get(
+                reverse('posts:post_detail', args=(post.pk,)))
+
+        engine.get_image.assert_not_called()
+        self.assertContains(response, 'class="card-img my-2"')
+
+    def test_pages_never_build_thumbnails(self):
+        '''Без готовых миниатюр страница показывает оригинал и ставит
+        миниатюры в очередь, а не строит их сама.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост',
+            image=unique_png('red'))
+
+        with mock.patch.object(default, 'engine') as engine, \
+                mock.patch.object(thumbnails, 'schedule') as schedule:
+            for url in (reverse('posts:index'),
+                        reverse('posts:post_detail', args=(post.pk,))):
+                with self.subTest(url=url):
+                    response = self.author_client.get(url)
+                    self.assertContains(response, f'src="{post.image.url}"')
+
+        engine.get_image.assert_not_called()
+        schedule.assert_called_with(post.image)
+
+    def test_generate_refreshes_cards(self):
+        '''Лента с оригиналом не кэшируется, а построенные миниатюры
+        сбрасывают только карточку поста, а не версии всех лент.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост',
+            image=unique_png('blue'))
+        url = reverse('posts:index')
+        self.assertNotContains(self.author_client.get(url), 'srcset')
+        versions = [get_version(prefix) for prefix in PAGE_PREFIXES]
+
+        thumbnails.generate(post.image)
+
+        self.assertContains(self.author_client.get(url), 'srcset')
+        self.assertEqual(
+            [get_version(prefix) for prefix in PAGE_PREFIXES], versions)
+
+    def test_failed_image_not_requeued(self):
+        '''Картинка, миниатюры которой не построились, больше не
+        ставится в очередь.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост',
+            image=unique_png('green'))
+        with mock.patch.object(thumbnails, 'get_thumbnail',
+                               side_effect=OSError('битый файл')), \
+                self.assertLogs('posts.thumbnails', level='ERROR'):
+            self.assertFalse(thumbnails.generate(post.image))
+
+        url = reverse('posts:index')
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            response = self.author_client.get(url)
+            self.assertContains(response, f'src="{post.image.url}"')
+            self.author_client.get(url)
+
+        schedule.assert_not_called()
+        self.assertTrue(thumbnails.failed(post.image))
+        with mock.patch.object(thumbnails, 'generate') as generate:
+            thumbnails.submit(post.image)
+        generate.assert_not_called()
+
+    def test_picture_markup(self):
+        '''Картинка отдаётся в <picture> со srcset во всех ширинах.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост', image=uploaded_gif())
+        thumbnails.generate(post.image)
+
+        response = self.author_client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, 'type="image/webp"')
+        for width in settings.POST_IMAGE_VARIANTS['card']['widths']:
+            with self.subTest(width=width):
+                self.assertContains(response, f'.webp {width}w')
+                self.assertContains(response, f'.jpg {width}w')
+        self.assertContains(response, 'width="960" height="339"')
+
+    @override_settings(POST_IMAGE_FORMATS=(
+        ('NO_SUCH_FORMAT', {}), ('JPEG', {})))
+    def test_unsupported_formats_skipped(self):
+        '''Форматы, которые Pillow не умеет записывать, пропускаются.'''
+        post = Post.objects.create(
+            author=ThumbnailsTests.author, text='Пост', image=uploaded_gif())
+
+        picture = thumbnails.picture(post.image, 'card')
+
+        self.assertEqual(picture['sources'], [])
+        self.assertTrue(picture['src'].endswith('.jpg'))
+
+    def test_backend_knows_avif_extension(self):
+        '''Имя миниатюры AVIF получает расширение .avif.'''
+        name = thumbnails.ThumbnailBackend()._get_thumbnail_filename(
+            ImageFile('posts/small.gif'), '480x170', {'format': 'AVIF'})
+
+        self.assertTrue(name.endswith('.avif'))
+
+    def test_form_schedules_thumbnails(self):
+        '''Миниатюры ставятся в очередь, только когда форма меняет картинку.'''
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.author_client.post(
+                reverse('posts:post_create'),
+                {'text': 'Пост', 'image': uploaded_gif('new.gif')})
+            post = Post.objects.get(text='Пост')
+            schedule.assert_called_once_with(post.image)
+
+            schedule.reset_mock()
+            self.author_client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'Новый текст'})
+            schedule.assert_not_called()
@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from ..models import Post
+from ..uploads import read_dimensions
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def image_bytes(size, image_format='PNG'):
+    content = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(content, image_format)
+    return content.getvalue()
+
+
+def uploaded_image(size, image_format='PNG', name='image.png'):
+    return SimpleUploadedFile(
+        name=name, content=image_bytes(size, image_format),
+        content_type=Image.MIME[image_format])
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Индекс миниатюр общий для прогонов, а MEDIA_ROOT временный.
+        default.kvstore.clear()
+        self.author_client = Client()
+        self.author_client.force_login(ImageUploadTests.author)
+
+    def create_post(self, image):
+        return self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image})
+
+    @override_settings(POST_IMAGE_MAX_BYTES=1024)
+    def test_large_file_rejected(self):
+        '''Файл больше POST_IMAGE_MAX_BYTES отклоняется с ошибкой формы.'''
+        response = self.create_post(
+            uploaded_image((300, 300), 'BMP', name='big.bmp'))
+
+        self.assertIn('Файл больше',
+                      response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_large_dimensions_rejected(self):
+        '''Картинка больше POST_IMAGE_MAX_PIXELS отклоняется по заголовку.'''
+        response = self.create_post(uploaded_image((50, 50)))
+
+        self.assertIn('50x50', response.context['form'].errors['image'][0])
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_SIDE=20)
+    def test_huge_image_shrunk(self):
+        '''Картинка больше POST_IMAGE_MAX_SIDE уменьшается до сохранения.'''
+        self.create_post(uploaded_image((50, 30), 'JPEG', name='photo.jpg'))
+
+        post = Post.objects.get()
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (20, 12))
+            self.assertEqual(image.format, 'JPEG')
+
+    def test_small_image_kept(self):
+        '''Небольшая картинка сохраняется без изменений.'''
+        content = image_bytes((40, 40))
+        self.create_post(SimpleUploadedFile(
+            name='small.png', content=content, content_type='image/png'))
+
+        self.assertEqual(Post.objects.get().image.read(), content)
+
+    def test_read_dimensions(self):
+        '''Размеры читаются из заголовка, а обрезанные данные дают None.'''
+        content = image_bytes((64, 48))
+
+        self.assertEqual(read_dimensions(content[:64]), (64, 48))
+        self.assertIsNone(read_dimensions(content[:8]))
@@ -1,14 +1,18 @@
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from .. import timeline
 from ..models import Comment, Follow, Group, Post
 
 POSTS_GROUP = 11
@@ -115,6 +119,7 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.author_client = Client()
         self.author_client.force_login(PostsPagesTests.author)
         self.guest_client = Client()
@@ -179,11 +184,42 @@ class PostsPagesTests(TestCase):
 
         for reverse_name, number_of_posts in reverse_posts.items():
             with self.subTest(reverse_name=reverse_name):
-                response = self.author_client.get(reverse_name + '?page=2')
+                first_page = self.author_client.get(
+                    reverse_name).context.get('page_obj')
+                response = self.author_client.get(
+                    reverse_name,
+                    {'cursor': first_page.paginator.next_cursor})
                 self.assertEqual(
                     len(response.context.get('page_obj')), number_of_posts)
         cache.clear()
 
+    def test_previous_paginator_page(self):
+        '''Курсор «назад» со 2-й стр. возвращает 1-ю страницу.'''
+        url = reverse('posts:profile', args=(PostsPagesTests.author.username,))
+        first_page = self.author_client.get(url).context.get('page_obj')
+        second_page = self.author_client.get(
+            url, {'cursor': first_page.paginator.next_cursor}
+        ).context.get('page_obj')
+        response = self.author_client.get(
+            url, {'cursor': second_page.paginator.previous_cursor})
+        page_obj = response.context.get('page_obj')
+
+        self.assertFalse(first_page.has_previous())
+        self.assertFalse(second_page.has_next())
+        self.assertEqual(list(page_obj), list(first_page))
+        self.assertFalse(page_obj.has_previous())
+        self.assertTrue(page_obj.has_next())
+
+    def test_invalid_cursor_shows_first_page(self):
+        '''Повреждённый курсор открывает первую страницу.'''
+        url = reverse('posts:profile', args=(PostsPagesTests.author.username,))
+        first_page = self.author_client.get(url).context.get('page_obj')
+
+        response = self.author_client.get(url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(
+            list(response.context.get('page_obj')), list(first_page))
+
     def test_post_page_show_correct_context(self):
         '''Шаблон страницы поста имеет правильный контекст.'''
         post = Post.objects.get(pk=1)
@@ -339,27 +375,27 @@ class PostsPagesTests(TestCase):
         self.assertIn('Пост для тестирования кэша'.encode(), cache_after_add)
         cache.clear()
 
-    def test_cache_delete(self):
-        '''Пост остаётся в кэше после удаления.'''
+    def test_cache_keeps_page(self):
+        '''Страница берётся из кэша, пока версия кэша не изменилась.'''
         new_post = Post.objects.create(
             author=PostsPagesTests.author,
             text='Пост для кэша',
             group=PostsPagesTests.group
         )
 
-        cache_before_delete = self.author_client.get(
+        cache_before_update = self.author_client.get(
             reverse('posts:index')
         ).content
 
-        self.assertIn('Пост для кэша'.encode(), cache_before_delete)
+        self.assertIn('Пост для кэша'.encode(), cache_before_update)
 
-        new_post.delete()
+        Post.objects.filter(pk=new_post.pk).update(text='Тихая правка')
 
-        cache_after_delete = self.author_client.get(
+        cache_after_update = self.author_client.get(
             reverse('posts:index')
         ).content
 
-        self.assertIn('Пост для кэша'.encode(), cache_after_delete)
+        self.assertIn('Пост для кэша'.encode(), cache_after_update)
 
         cache.clear()
 
@@ -371,6 +407,30 @@ class PostsPagesTests(TestCase):
 
         cache.clear()
 
+    def test_cache_invalidated_on_delete(self):
+        '''Удалённый пост сразу пропадает с закэшированной главной.'''
+        new_post = Post.objects.create(
+            author=PostsPagesTests.author,
+            text='Пост для кэша',
+            group=PostsPagesTests.group
+        )
+
+        cache_before_delete = self.author_client.get(
+            reverse('posts:index')
+        ).content
+
+        self.assertIn('Пост для кэша'.encode(), cache_before_delete)
+
+        new_post.delete()
+
+        cache_after_delete = self.author_client.get(
+            reverse('posts:index')
+        ).content
+
+        self.assertNotIn('Пост для кэша'.encode(), cache_after_delete)
+
+        cache.clear()
+
     def test_follow(self):
         '''Можно подписаться на автора.'''
 
@@ -423,3 +483,176 @@ class PostsPagesTests(TestCase):
 
         for post in just_user_response.context.get('page_obj'):
             self.assertNotEqual(post, new_post)
+
+    def test_follow_backfills_timeline(self):
+        '''После подписки старые посты автора появляются в ленте.'''
+        old_post = Post.objects.create(
+            author=PostsPagesTests.another_author,
+            text='Пост до подписки',
+        )
+
+        self.just_user_client.get(
+            reverse('posts:profile_follow',
+                    args=(PostsPagesTests.another_author.username,))
+        )
+        response = self.just_user_client.get(reverse('posts:follow_index'))
+
+        self.assertIn(old_post, response.context.get('page_obj'))
+
+    def test_unfollow_prunes_timeline(self):
+        '''После отписки посты автора пропадают из ленты.'''
+        self.follower_user_client.get(
+            reverse('posts:profile_unfollow',
+                    args=(PostsPagesTests.author.username,))
+        )
+        response = self.follower_user_client.get(
+            reverse('posts:follow_index')
+        )
+
+        self.assertEqual(len(response.context.get('page_obj')), 0)
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=0)
+    def test_celebrity_posts_merged_on_read(self):
+        '''Посты популярного автора подмешиваются в ленту при чтении.'''
+        cache.clear()
+        Follow.objects.create(
+            user=PostsPagesTests.follower_user,
+            author=PostsPagesTests.another_author
+        )
+        timeline.sync_timelines()
+        celebrity_post = Post.objects.create(
+            author=PostsPagesTests.another_author,
+            text='Пост популярного автора',
+        )
+
+        response = self.follower_user_client.get(
+            reverse('posts:follow_index')
+        )
+        page_obj = response.context.get('page_obj')
+
+        self.assertFalse(celebrity_post.timeline_entries.exists())
+        self.assertEqual(page_obj[0], celebrity_post)
+        self.assertEqual(len(page_obj), settings.POSTS_PER_PAGE)
+        self.assertEqual(len(set(page_obj)), len(page_obj))
+        cache.clear()
+
+    def change_follow(self, client, author, follow=True):
+        name = 'posts:profile_follow' if follow else 'posts:profile_unfollow'
+        client.get(reverse(name, args=(author.username,)))
+        # В тестах on_commit не срабатывает: сбрасываем список сами.
+        cache.clear()
+
+    def feed(self):
+        # Список популярных авторов обычно уже лежит в кэше.
+        timeline.celebrities()
+        return self.follower_user_client.get(
+            reverse('posts:follow_index')).context.get('page_obj')
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1,
+                       FEED_CELEBRITY_DEMOTE_FOLLOWERS=1)
+    def test_former_celebrity_posts_fanned_out(self):
+        '''Посты автора, выпавшего из популярных, остаются в ленте.'''
+        author = PostsPagesTests.another_author
+        self.change_follow(self.follower_user_client, author)
+        self.change_follow(self.just_user_client, author)
+        timeline.sync_timelines()
+        celebrity_post = Post.objects.create(
+            author=author, text='Пост популярного автора')
+        self.assertFalse(celebrity_post.timeline_entries.exists())
+
+        self.change_follow(self.just_user_client, author, follow=False)
+        self.assertIn(celebrity_post, self.feed())
+
+        call_command('sync_timelines', stdout=StringIO())
+        self.assertTrue(celebrity_post.timeline_entries.filter(
+            user=PostsPagesTests.follower_user).exists())
+        cache.clear()
+        self.assertIn(celebrity_post, self.feed())
+        cache.clear()
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_new_celebrity_entries_pruned(self):
+        '''Записи автора, ставшего популярным, убираются из лент.'''
+        cache.clear()
+        post = Post.objects.create(
+            author=PostsPagesTests.author,
+            text='Пост до популярности',
+        )
+        self.change_follow(self.just_user_client, PostsPagesTests.author)
+        self.assertTrue(post.timeline_entries.exists())
+        page_obj = self.feed()
+        self.assertEqual(page_obj[0], post)
+        self.assertEqual(len(set(page_obj)), len(page_obj))
+
+        call_command('sync_timelines', stdout=StringIO())
+
+        self.assertFalse(post.timeline_entries.exists())
+        self.assertEqual(self.feed()[0], post)
+        cache.clear()
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1,
+                       FEED_CELEBRITY_DEMOTE_FOLLOWERS=0)
+    def test_boundary_follows_keep_celebrity(self):
+        '''Подписки у границы порога не перестраивают ленты каждый раз.'''
+        author = PostsPagesTests.another_author
+        self.change_follow(self.follower_user_client, author)
+        self.change_follow(self.just_user_client, author)
+        self.assertEqual(timeline.sync_timelines(), 1)
+
+        with mock.patch.object(timeline, 'rebuild_author') as rebuild:
+            for _ in range(3):
+                self.change_follow(self.just_user_client, author, follow=False)
+                self.change_follow(self.just_user_client, author)
+            self.assertEqual(timeline.sync_timelines(), 0)
+
+        rebuild.assert_not_called()
+        self.assertIn(author.pk, timeline.celebrities())
+        cache.clear()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=cls.author, text=f'Комментарий {number}')
+            for number in range(8)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_post_detail_shows_first_comments(self):
+        '''На странице поста только первые комментарии, от старых к новым.'''
+        post = CommentPaginationTests.post
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)))
+        comments = response.context['comments']
+
+        self.assertEqual(list(comments), CommentPaginationTests.comments[:3])
+        self.assertContains(
+            response, reverse('posts:post_comments', args=(post.pk,)))
+
+    def test_fragment_loads_all_comments(self):
+        '''Порции комментариев по курсору дают все комментарии по разу.'''
+        post = CommentPaginationTests.post
+        url = reverse('posts:post_comments', args=(post.pk,))
+        loaded = []
+        cursor = ''
+        while cursor is not None:
+            response = self.client.get(url, {'cursor': cursor})
+            comments = response.context['comments']
+            loaded.extend(comments)
+            cursor = comments.paginator.next_cursor
+
+        self.assertEqual(loaded, CommentPaginationTests.comments)
+        self.assertNotContains(response, '<html')
+
+    def test_fragment_missing_post(self):
+        '''Порция комментариев несуществующего поста отвечает 404.'''
+        response = self.client.get(reverse('posts:post_comments', args=(0,)))
+        self.assertEqual(response.status_code, 404)
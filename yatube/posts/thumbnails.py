@@ -0,0 +1,190 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from PIL import Image
+from sorl.thumbnail import base, default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile
+
+from .caching import bump_stamp
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class ThumbnailBackend(base.ThumbnailBackend):
+    '''Бэкенд sorl-thumbnail, который знает расширения всех форматов.
+
+    Штатный бэкенд падает на форматах вне своего списка, например AVIF.
+
+    '''
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        key = tokey(source.key, geometry_string, serialize(options))
+        path = '%s/%s/%s' % (key[:2], key[2:4], key)
+        extension = (base.EXTENSIONS.get(options['format'])
+                     or options['format'].lower())
+        return f'{thumbnail_settings.THUMBNAIL_PREFIX}{path}.{extension}'
+
+    def cached_thumbnail(self, file_, geometry_string, **options):
+        '''Готовая миниатюра из key-value хранилища или None.
+
+        Опции дополняются так же, как в get_thumbnail, но картинка
+        не открывается и Pillow не вызывается.
+
+        '''
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(
+            ImageFile(file_), geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def supported_formats() -> list:
+    '''Форматы из POST_IMAGE_FORMATS, которые Pillow умеет записывать.'''
+    Image.init()
+    return [(image_format, options)
+            for image_format, options in settings.POST_IMAGE_FORMATS
+            if image_format in Image.SAVE]
+
+
+def geometry(variant: dict, width: int) -> str:
+    ratio_width, ratio_height = variant['ratio']
+    return f'{width}x{round(width * ratio_height / ratio_width)}'
+
+
+def srcset(images) -> str:
+    return ', '.join(f'{image.url} {image.width}w' for image in images)
+
+
+def picture(image, name: str, build: bool = True):
+    '''Собирает варианты картинки для разметки <picture>.
+
+    Для каждого формата берутся миниатюры всех ширин варианта name из
+    POST_IMAGE_VARIANTS. Последний формат из POST_IMAGE_FORMATS идёт в
+    <img>, остальные — в <source>. С build=False миниатюры только
+    ищутся в key-value хранилище sorl-thumbnail, а если хоть одной
+    нет, возвращается None.
+
+    '''
+    variant = settings.POST_IMAGE_VARIANTS[name]
+    thumbnail = get_thumbnail if build else default.backend.cached_thumbnail
+    sources = []
+    for image_format, format_options in supported_formats():
+        options = dict(variant['options'], format=image_format,
+                       **format_options)
+        images = [thumbnail(image, geometry(variant, width), **options)
+                  for width in variant['widths']]
+        if not all(images):
+            return None
+        sources.append({
+            'type': Image.MIME.get(image_format,
+                                   f'image/{image_format.lower()}'),
+            'srcset': srcset(images),
+            'largest': images[-1],
+        })
+    fallback = sources.pop()
+    return {
+        'sources': sources,
+        'src': fallback['largest'].url,
+        'srcset': fallback['srcset'],
+        'width': fallback['largest'].width,
+        'height': fallback['largest'].height,
+        'sizes': variant['sizes'],
+    }
+
+
+def failure_key(name: str) -> str:
+    return f'thumbnails.failed.{name}'
+
+
+def failed(image) -> bool:
+    '''Не удалось ли недавно построить миниатюры этой картинки.'''
+    return cache.get(failure_key(image.name)) is not None
+
+
+def refresh_cards(names) -> None:
+    '''Сбрасывает карточки постов, показавшие картинки без миниатюр.'''
+    for pk in Post.objects.filter(image__in=names).values_list(
+            'pk', flat=True):
+        bump_stamp('post', pk)
+
+
+def generate(image, refresh: bool = True) -> bool:
+    '''Строит все варианты картинки из POST_IMAGE_VARIANTS.
+
+    Возвращает True, если чего-то не хватало. Тогда с refresh
+    сбрасываются и карточки постов с картинкой: пока миниатюр не было,
+    они показывали оригинал. Ошибка запоминается на
+    THUMBNAIL_FAILURE_SECONDS, чтобы страницы не ставили картинку в
+    очередь снова и снова.
+
+    '''
+    try:
+        variants = settings.POST_IMAGE_VARIANTS
+        if all(picture(image, name, build=False) for name in variants):
+            return False
+        for name in variants:
+            picture(image, name)
+        if refresh:
+            refresh_cards([image.name])
+        return True
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', image.name)
+        cache.set(failure_key(image.name), True,
+                  settings.THUMBNAIL_FAILURE_SECONDS)
+        return False
+    finally:
+        with _pending_lock:
+            _pending.discard(image.name)
+        close_old_connections()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+        return _executor
+
+
+def submit(image) -> None:
+    '''Отдаёт картинку пулу, если она не ждёт там очереди и не сломана.'''
+    if failed(image):
+        return
+    with _pending_lock:
+        if image.name in _pending:
+            return
+        _pending.add(image.name)
+    if settings.THUMBNAIL_WORKERS:
+        get_executor().submit(generate, image)
+    else:
+        generate(image)
+
+
+def schedule(image) -> None:
+    '''Ставит построение миниатюр в пул после коммита транзакции.
+
+    Pillow отпускает GIL при масштабировании, поэтому хватает пула
+    потоков. При THUMBNAIL_WORKERS = 0 миниатюры строятся сразу.
+
+    '''
+    if image:
+        transaction.on_commit(lambda: submit(image))
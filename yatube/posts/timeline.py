@@ -0,0 +1,260 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+
+CELEBRITIES_CACHE_KEY = 'feed_celebrities'
+
+
+def celebrity_sets() -> tuple:
+    '''Авторы без раскладки по лентам и авторы, подмешиваемые при чтении.
+
+    Ленты подписчиков собраны как для популярного автора, когда у него
+    стоит флаг celebrity_timelines: его посты подмешиваются при чтении.
+    Раскладка новых постов выключается, только пока стоит и флаг
+    celebrity. Оба множества читаются одним запросом и хранятся в кэше
+    FEED_CELEBRITY_CACHE_SECONDS, чтобы запись и чтение ленты опирались
+    на одно и то же решение.
+
+    '''
+    sets = cache.get(CELEBRITIES_CACHE_KEY)
+    if sets is None:
+        rows = list(UserCounters.objects.filter(
+            celebrity_timelines=True
+        ).values_list('user_id', 'celebrity'))
+        sets = (
+            frozenset(user_id for user_id, celebrity in rows if celebrity),
+            frozenset(user_id for user_id, _ in rows),
+        )
+        cache.set(CELEBRITIES_CACHE_KEY, sets,
+                  settings.FEED_CELEBRITY_CACHE_SECONDS)
+    return sets
+
+
+def celebrities() -> frozenset:
+    '''Возвращает id авторов, чьи посты не раскладываются по лентам.'''
+    return celebrity_sets()[0]
+
+
+def merged_authors() -> frozenset:
+    '''Возвращает id авторов, чьи посты подмешиваются в ленты при чтении.
+
+    Кроме популярных авторов это те, кто перестал быть популярным, но
+    чьи посты sync_timelines ещё не разложил по лентам подписчиков.
+
+    '''
+    return celebrity_sets()[1]
+
+
+def forget_celebrities() -> None:
+    '''Сбрасывает список популярных авторов после коммита.'''
+    transaction.on_commit(lambda: cache.delete(CELEBRITIES_CACHE_KEY))
+
+
+def promote(author_id: int) -> None:
+    '''Отмечает автора популярным, если подписчиков больше порога.
+
+    Ленты здесь не меняются: посты автора раскладываются по ним, пока
+    sync_timelines вне запроса не уберёт их оттуда.
+
+    '''
+    UserCounters.objects.filter(
+        user_id=author_id, celebrity=False,
+        followers_count__gt=settings.FEED_CELEBRITY_FOLLOWERS,
+    ).update(celebrity=True)
+
+
+def demote(author_id: int) -> None:
+    '''Снимает отметку популярного автора.
+
+    Отметка снимается, только когда подписчиков не больше
+    FEED_CELEBRITY_DEMOTE_FOLLOWERS: нижний порог не даёт автору на
+    границе переключаться при каждой подписке и отписке. Новые посты
+    сразу раскладываются по лентам, старые подмешиваются при чтении,
+    пока sync_timelines не разложит и их.
+
+    '''
+    if UserCounters.objects.filter(
+            user_id=author_id, celebrity=True,
+            followers_count__lte=settings.FEED_CELEBRITY_DEMOTE_FOLLOWERS,
+    ).update(celebrity=False):
+        forget_celebrities()
+
+
+def sync_timelines() -> int:
+    '''Приводит ленты подписчиков к флагу celebrity их авторов.
+
+    Записи новых популярных авторов убираются из лент, а последние посты
+    тех, кто перестал быть популярным, раскладываются по лентам заново.
+    До этого ленты остаются полными: новому популярному посты ещё
+    раскладываются, а бывшему — подмешиваются при чтении. Возвращает
+    число обработанных авторов.
+
+    '''
+    pending = list(UserCounters.objects.exclude(
+        celebrity=F('celebrity_timelines')
+    ).values_list('user_id', 'celebrity'))
+    for author_id, celebrity in pending:
+        with transaction.atomic():
+            if celebrity:
+                TimelineEntry.objects.filter(
+                    post__author_id=author_id).delete()
+            else:
+                rebuild_author(author_id)
+            # Если флаг успел смениться снова, автор останется в очереди.
+            UserCounters.objects.filter(
+                user_id=author_id, celebrity=celebrity
+            ).update(celebrity_timelines=celebrity)
+    if pending:
+        cache.delete(CELEBRITIES_CACHE_KEY)
+    return len(pending)
+
+
+def fan_out_post(post: Post) -> None:
+    '''Добавляет новый пост в ленты всех подписчиков его автора.'''
+    if post.author_id in celebrities():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id: int, author_id: int) -> None:
+    '''Добавляет в ленту читателя последние посты автора после подписки.'''
+    if author_id in celebrities():
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL_POSTS]
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id: int, author_id: int) -> None:
+    '''Убирает посты автора из ленты читателя после отписки.'''
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_all() -> None:
+    '''Пересобирает ленты всех читателей по текущим подпискам.
+
+    Нужна после массовой загрузки данных в обход сигналов и после смены
+    FEED_CELEBRITY_FOLLOWERS: популярными становятся ровно те, у кого
+    подписчиков больше порога. Работает одним INSERT ... SELECT и не
+    ограничивает число постов автора.
+
+    '''
+    timeline_table = TimelineEntry._meta.db_table
+    follow_table = Follow._meta.db_table
+    post_table = Post._meta.db_table
+    authors = list(UserCounters.objects.filter(
+        followers_count__gt=settings.FEED_CELEBRITY_FOLLOWERS
+    ).values_list('user_id', flat=True)) or [0]
+    placeholders = ', '.join(['%s'] * len(authors))
+    with transaction.atomic():
+        UserCounters.objects.filter(user_id__in=authors).update(
+            celebrity=True, celebrity_timelines=True)
+        UserCounters.objects.exclude(user_id__in=authors).update(
+            celebrity=False, celebrity_timelines=False)
+        TimelineEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {timeline_table} (user_id, post_id, pub_date) '
+                f'SELECT f.user_id, p.id, p.pub_date FROM {follow_table} f '
+                f'JOIN {post_table} p ON p.author_id = f.author_id '
+                f'WHERE f.author_id NOT IN ({placeholders})',
+                authors,
+            )
+    cache.delete(CELEBRITIES_CACHE_KEY)
+
+
+def rebuild_author(author_id: int) -> None:
+    '''Раскладывает последние посты автора по лентам его подписчиков.
+
+    Берутся TIMELINE_BACKFILL_POSTS последних постов, как при подписке.
+
+    '''
+    timeline_table = TimelineEntry._meta.db_table
+    follow_table = Follow._meta.db_table
+    post_table = Post._meta.db_table
+    sql = (
+        f'INSERT INTO {timeline_table} (user_id, post_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.pub_date FROM {follow_table} f '
+        f'JOIN {post_table} p ON p.author_id = f.author_id '
+        f'WHERE f.author_id = %s'
+    )
+    params = [author_id]
+    oldest = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pub_date', flat=True)[
+        settings.TIMELINE_BACKFILL_POSTS - 1:settings.TIMELINE_BACKFILL_POSTS
+    ].first()
+    if oldest is not None:
+        sql += ' AND p.pub_date >= %s'
+        params.append(connection.ops.adapt_datetimefield_value(oldest))
+    with transaction.atomic():
+        TimelineEntry.objects.filter(post__author_id=author_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+
+def followed_celebrities(user) -> list:
+    '''Популярные авторы, на которых подписан читатель.
+
+    За запрос ленту читают дважды — для ETag и для страницы, поэтому
+    список запоминается на объекте пользователя.
+
+    '''
+    authors = merged_authors()
+    if not authors:
+        return []
+    if not hasattr(user, '_followed_celebrities'):
+        user._followed_celebrities = list(user.follower.filter(
+            author_id__in=authors
+        ).values_list('author_id', flat=True))
+    return user._followed_celebrities
+
+
+def feed_sources(user) -> list:
+    '''Возвращает отсортированные потоки записей для ленты подписок.
+
+    Первый поток — собственная лента читателя, остальные — посты
+    популярных авторов, на которых он подписан. У всех записей есть
+    поля pub_date и post_id, по ним потоки сливаются при чтении.
+
+    '''
+    # Не user.timeline: менеджер связи читает user_id у каждой записи,
+    # а это поле отложено в only() и стоило бы запроса на запись.
+    sources = [
+        TimelineEntry.objects.filter(user=user).only('pub_date', 'post_id')
+    ]
+    followed = followed_celebrities(user)
+    if followed:
+        sources.append(
+            Post.objects.filter(
+                author_id__in=followed
+            ).annotate(post_id=F('pk')).only('pub_date')
+        )
+    return sources
+
+
+def load_posts(rows) -> list:
+    '''Загружает посты для записей страницы ленты, сохраняя порядок.'''
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [row.post_id for row in rows]
+    )
+    return [posts[row.post_id] for row in rows if row.post_id in posts]
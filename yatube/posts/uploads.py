@@ -0,0 +1,145 @@
+import math
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps
+
+HEADER_BYTES = 256 * 1024
+REENCODE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 85},
+}
+
+
+class RejectedUpload(UploadedFile):
+    '''Файл, от которого ImageUploadHandler сохранил только описание.'''
+
+    def __init__(self, name, content_type, size, error):
+        super().__init__(BytesIO(), name, content_type, size)
+        self.error = error
+
+
+def size_error(size: int):
+    max_bytes = settings.POST_IMAGE_MAX_BYTES
+    if size > max_bytes:
+        return f'Файл больше {filesizeformat(max_bytes)}.'
+    return None
+
+
+def dimensions_error(dimensions):
+    width, height = dimensions
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return (f'Картинка {width}x{height} слишком большая: можно не '
+                f'больше {settings.POST_IMAGE_MAX_PIXELS} пикселей.')
+    return None
+
+
+def read_dimensions(header: bytes):
+    '''Размеры картинки по началу файла или None, если их там нет.
+
+    Image.open читает только заголовок и не декодирует пиксели.
+
+    '''
+    try:
+        with Image.open(BytesIO(header)) as image:
+            return image.size
+    except Image.DecompressionBombError:
+        # Pillow отказывается открывать такие картинки: размер неважен.
+        return (settings.POST_IMAGE_MAX_PIXELS + 1, 1)
+    except Exception:
+        # Обрезанный заголовок каждый формат разбирает со своей ошибкой.
+        return None
+
+
+class ImageUploadHandler(FileUploadHandler):
+    '''Не даёт слишком большим картинкам дойти до памяти и диска.
+
+    Стоит первым в FILE_UPLOAD_HANDLERS. Считает принятые байты и по
+    первым килобайтам читает размеры картинки. Как только файл выходит
+    за POST_IMAGE_MAX_BYTES или POST_IMAGE_MAX_PIXELS, остаток потока
+    пропускается мимо следующих обработчиков, а вместо файла в
+    request.FILES попадает RejectedUpload с текстом ошибки.
+
+    '''
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.header = b''
+        self.error = None
+        if self.content_length:
+            self.error = size_error(self.content_length)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is None:
+            self.received += len(raw_data)
+            self.error = size_error(self.received)
+        if self.error is None and self.header is not None:
+            self.check_header(raw_data)
+        if self.error is not None:
+            return None
+        return raw_data
+
+    def check_header(self, raw_data):
+        self.header += raw_data[:HEADER_BYTES - len(self.header)]
+        dimensions = read_dimensions(self.header)
+        if dimensions is not None:
+            self.error = dimensions_error(dimensions)
+        if dimensions is not None or len(self.header) >= HEADER_BYTES:
+            # Дальше размеры проверит форма по целому файлу.
+            self.header = None
+
+    def file_complete(self, file_size):
+        if self.error is None:
+            return None
+        return RejectedUpload(
+            self.file_name, self.content_type, self.received, self.error)
+
+
+def pop_rejected(files) -> dict:
+    '''Убирает из files отклонённые загрузки и возвращает их ошибки.'''
+    errors = {}
+    for field, uploaded in list(files.items()):
+        if isinstance(uploaded, RejectedUpload):
+            errors[field] = uploaded.error
+            del files[field]
+    return errors
+
+
+def shrink(uploaded):
+    '''Уменьшает картинку до POST_IMAGE_MAX_SIDE по большей стороне.
+
+    Картинка перекодируется без метаданных. JPEG с помощью draft()
+    декодируется сразу в уменьшенном масштабе, так что в памяти не
+    оказывается полноразмерного растра. Небольшие картинки
+    возвращаются как есть.
+
+    '''
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    uploaded.seek(0)
+    with Image.open(uploaded) as image:
+        if max(image.size) <= max_side:
+            uploaded.seek(0)
+            return uploaded
+        image_format = image.format
+        if image_format not in REENCODE_OPTIONS:
+            image_format = 'PNG'
+        ratio = max_side / max(image.size)
+        image.draft('RGB', tuple(math.ceil(side * ratio)
+                                 for side in image.size))
+        resized = ImageOps.exif_transpose(image)
+    resized.thumbnail((max_side, max_side))
+    if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+    content = BytesIO()
+    resized.save(content, image_format, **REENCODE_OPTIONS[image_format])
+    name = (os.path.splitext(uploaded.name)[0] + '.'
+            + image_format.lower().replace('jpeg', 'jpg'))
+    return InMemoryUploadedFile(
+        content, getattr(uploaded, 'field_name', None), name,
+        Image.MIME[image_format], content.tell(), None)
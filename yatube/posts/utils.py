@@ -1,7 +1,215 @@
+import base64
+import binascii
+import heapq
+import json
+
 from django.conf import settings
 from django.core.handlers.wsgi import WSGIRequest
 from django.core.paginator import Page, Paginator
+from django.db import connection
+from django.db.models import AutoField
 from django.db.models.query import QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction: str, value, pk: int) -> str:
+    '''Упаковывает позицию в ленте в непрозрачную строку для ?cursor=.'''
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    raw = json.dumps([direction, value, pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, parse_value=parse_datetime):
+    '''Распаковывает строку курсора.
+
+    Возвращает кортеж (направление, значение поля, pk) или None,
+    если курсор пустой или повреждён. Значение поля разбирается
+    функцией parse_value, по умолчанию — как дата.
+
+    '''
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, value, pk = json.loads(raw.decode())
+        value = parse_value(value)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    if (direction not in (CURSOR_NEXT, CURSOR_PREVIOUS)
+            or value is None or not isinstance(pk, int)):
+        return None
+    return direction, value, pk
+
+
+class CursorPaginator(Paginator):
+    '''Keyset-пагинация по паре (поле даты, id) от новых записей к старым.
+
+    В отличие от Paginator не выполняет COUNT(*) и OFFSET: каждая
+    страница — это один запрос с условием по ключу крайней показанной
+    записи. Паджинатор хранит курсоры соседних страниц для той страницы,
+    которую вернул get_page(); номер страницы условный: 1 — начало
+    ленты, 2 — любая следующая страница. С descending=False лента идёт
+    от старых записей к новым, как комментарии.
+
+    '''
+
+    num_pages = 1
+
+    def __init__(self, object_list, per_page, field='pub_date', key='pk',
+                 descending=True):
+        super().__init__(object_list, per_page)
+        self.field = field
+        self.key = key
+        self.descending = descending
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def sort_key(self, obj):
+        return getattr(obj, self.field), getattr(obj, self.key)
+
+    def parse_value(self, value):
+        return parse_datetime(value)
+
+    def cursor_for(self, direction: str, obj) -> str:
+        return encode_cursor(direction, *self.sort_key(obj))
+
+    def reads_descending(self, position) -> bool:
+        '''Читаются ли записи для этой позиции по убыванию ключа.'''
+        forward = position is None or position[0] == CURSOR_NEXT
+        return forward == self.descending
+
+    def page_queryset(self, queryset, position):
+        '''Выбирает не больше per_page + 1 записей за позицией курсора.
+
+        Записи идут в порядке обхода: вперёд по ленте, а для курсора
+        «назад» — в обратную сторону. Условие записано как диапазон по
+        полю даты, чтобы база могла начать чтение индекса сразу с нужной
+        позиции.
+
+        '''
+        field, key = self.field, self.key
+        if self.reads_descending(position):
+            until, after = 'lte', 'gte'
+            ordering = (f'-{field}', f'-{key}')
+        else:
+            until, after = 'gte', 'lte'
+            ordering = (field, key)
+        if position is not None:
+            _, value, pk = position
+            queryset = queryset.filter(**{f'{field}__{until}': value}).exclude(
+                **{field: value, f'{key}__{after}': pk})
+        return queryset.order_by(*ordering)[:self.per_page + 1]
+
+    def fetch(self, queryset, position):
+        return list(self.page_queryset(queryset, position))
+
+    def rows(self, position):
+        return self.fetch(self.object_list, position)
+
+    def get_page(self, cursor) -> Page:
+        '''Возвращает страницу после (или до) позиции из курсора.
+
+        Пустой или некорректный курсор означает первую страницу.
+
+        '''
+        position = decode_cursor(cursor, self.parse_value)
+        rows = self.rows(position)
+        if position is None or position[0] == CURSOR_NEXT:
+            has_next = len(rows) > self.per_page
+            has_previous = position is not None
+            rows = rows[:self.per_page]
+        else:
+            has_next = True
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+
+        if has_next and rows:
+            self.next_cursor = self.cursor_for(CURSOR_NEXT, rows[-1])
+        if has_previous and rows:
+            self.previous_cursor = self.cursor_for(CURSOR_PREVIOUS, rows[0])
+        number = 2 if self.previous_cursor else 1
+        self.num_pages = number + 1 if self.next_cursor else number
+
+        return self._get_page(rows, number, self)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    '''Keyset-пагинация по нескольким наборам записей сразу.
+
+    object_list — последовательность querysets с общими полями field и
+    key. Каждый набор выбирается по тому же курсору, а готовые
+    отсортированные потоки сливаются кучей (heapq.merge); записи
+    с одинаковым ключом попадают на страницу один раз.
+
+    '''
+
+    def rows(self, position):
+        streams = [self.fetch(queryset, position)
+                   for queryset in self.object_list]
+        merged = heapq.merge(*streams, key=self.sort_key,
+                             reverse=self.reads_descending(position))
+        rows = []
+        last_key = None
+        for obj in merged:
+            obj_key = self.sort_key(obj)
+            if obj_key == last_key:
+                continue
+            rows.append(obj)
+            last_key = obj_key
+            if len(rows) > self.per_page:
+                break
+        return rows
+
+
+def estimated_count(model):
+    '''Примерное число строк таблицы без COUNT(*) или None.
+
+    PostgreSQL берёт оценку из статистики pg_class, SQLite — наибольший
+    id, который читается с конца индекса первичного ключа.
+
+    '''
+    quote = connection.ops.quote_name
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table])
+        elif (connection.vendor == 'sqlite'
+                and isinstance(model._meta.pk, AutoField)):
+            cursor.execute(f'SELECT MAX({quote(model._meta.pk.column)}) '
+                           f'FROM {quote(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    '''Paginator для админки больших таблиц.
+
+    Для списка без фильтров число записей оценивается по статистике
+    базы, если оно больше ADMIN_COUNT_LIMIT. Отфильтрованные списки
+    считаются не дальше ADMIN_COUNT_LIMIT записей.
+
+    '''
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = settings.ADMIN_COUNT_LIMIT
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset[:limit].count()
 
 
 def paginate_posts(
@@ -10,13 +218,28 @@ def paginate_posts(
 ) -> Page:
     '''Возвращает объект страницы для страницы с постами и паджинатором.
 
+    Посты разбиваются на страницы по курсору из параметра ?cursor=,
+    без подсчёта общего количества записей.
+
     Параметры:
     request - объект http-запроса
     posts_queryset - набор постов из базы данных
 
     '''
-    paginator = Paginator(posts_queryset, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    paginator = CursorPaginator(posts_queryset, settings.POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     return page_obj
+
+
+def paginate_comments(comments_queryset: QuerySet, cursor=None) -> Page:
+    '''Возвращает страницу комментариев от старых к новым.
+
+    Первая страница показывается на странице поста, следующие
+    подгружаются по курсору.
+
+    '''
+    paginator = CursorPaginator(comments_queryset,
+                                settings.COMMENTS_PER_PAGE,
+                                field='created', descending=False)
+    return paginator.get_page(cursor)
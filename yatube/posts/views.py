@@ -1,29 +1,49 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.utils.http import urlencode
+from django.views.decorators.http import require_GET
 
+from core.decorators import query_budget
+
+from . import conditional, counters, events, search, thumbnails, timeline
+from .caching import (
+    GROUP_PAGE_CACHE_PREFIX, INDEX_PAGE_CACHE_PREFIX,
+    PROFILE_PAGE_CACHE_PREFIX,
+    versioned_cache_page
+)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import paginate_posts
+from .models import Comment, Follow, Group, Post
+from .utils import MergedCursorPaginator, paginate_comments, paginate_posts
 
 User = get_user_model()
 
 
-@cache_page(20, key_prefix='index_page')
+@query_budget(5)
+@conditional.feed_condition(conditional.index_state, per_user=True)
+@versioned_cache_page(settings.PAGE_CACHE_SECONDS,
+                      key_prefix=INDEX_PAGE_CACHE_PREFIX)
 def index(request):
     """Главная страница."""
-    page_obj = paginate_posts(request, Post.objects.select_related())
+    page_obj = paginate_posts(
+        request, Post.objects.select_related('author', 'group'))
     context = {'page_obj': page_obj, }
     return render(request, 'posts/index.html', context)
 
 
+@query_budget(6)
+@conditional.feed_condition(conditional.group_state, per_user=True)
+@versioned_cache_page(settings.PAGE_CACHE_SECONDS,
+                      key_prefix=GROUP_PAGE_CACHE_PREFIX)
 def group_posts(request, slug):
     """Страница группы."""
     group = get_object_or_404(Group, slug=slug)
     page_obj = paginate_posts(
         request,
-        group.posts.select_related('author'))
+        group.posts.select_related('author', 'group'))
     context = {
         'page_obj': page_obj,
         'group': group,
@@ -31,10 +51,15 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@query_budget(8)
+@conditional.feed_condition(conditional.profile_state, per_user=True)
+@versioned_cache_page(settings.PAGE_CACHE_SECONDS,
+                      key_prefix=PROFILE_PAGE_CACHE_PREFIX)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    page_obj = paginate_posts(request, author.posts.select_related())
-    num_posts = author.posts.count()
+    page_obj = paginate_posts(
+        request, author.posts.select_related('author', 'group'))
+    num_posts = counters.for_user(author.pk).posts_count
     following = request.user.is_authenticated and author.following.filter(
         user=request.user
     ).exists()
@@ -48,13 +73,16 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(7)
+@conditional.feed_condition(conditional.post_state, per_user=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    num_posts = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    num_posts = counters.for_user(post.author_id).posts_count
     is_author = bool(post.author == request.user)
     form = CommentForm(request.POST or None)
-    comments = post.comments.select_related()
-    num_comments = post.comments.count()
+    comments = paginate_comments(post.comments.select_related('author'))
+    num_comments = post.comments_count
     context = {
         'post': post,
         'num_posts': num_posts,
@@ -69,7 +97,21 @@ def post_detail(request, post_id):
     )
 
 
+@query_budget(2)
+@require_GET
+def post_comments(request, post_id):
+    """Следующая порция комментариев к посту для подгрузки на странице."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = paginate_comments(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        request.GET.get('cursor'))
+    return render(request, 'includes/comment_list.html',
+                  {'comments': comments, 'post_id': post_id})
+
+
+@query_budget(19)
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -80,6 +122,8 @@ def post_create(request):
         form_data = form.save(commit=False)
         form_data.author = request.user
         form_data.save()
+        thumbnails.schedule(form_data.image)
+        events.publish_post(form_data)
 
         return redirect('posts:profile', request.user.username)
 
@@ -89,11 +133,12 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(17)
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
 
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
 
     form = PostForm(
@@ -102,7 +147,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id)
 
     context = {
@@ -114,7 +161,9 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+@query_budget(10)
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -122,23 +171,30 @@ def add_comment(request, post_id):
         comment.author = request.user
         comment.post = Post.objects.get(pk=post_id)
         comment.save()
+        events.publish_comment(comment)
 
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(6)
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related()
-    page_obj = paginate_posts(request, posts)
+    paginator = MergedCursorPaginator(
+        timeline.feed_sources(request.user),
+        settings.POSTS_PER_PAGE,
+        key='post_id',
+    )
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    page_obj.object_list = timeline.load_posts(page_obj)
 
     context = {'page_obj': page_obj}
 
     return render(request, 'posts/follow.html', context)
 
 
+@query_budget(18)
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user and not request.user.follower.filter(
@@ -149,7 +205,9 @@ def profile_follow(request, username):
     return redirect('posts:follow_index')
 
 
+@query_budget(17)
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     follow = request.user.follower.filter(author=author)
@@ -157,3 +215,65 @@ def profile_unfollow(request, username):
         follow.delete()
 
     return redirect('posts:follow_index')
+
+
+@query_budget(5)
+def post_search(request):
+    """Поиск по постам и комментариям."""
+    query = request.GET.get('q', '').strip()
+    paginator = search.SearchPaginator(query, settings.POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    page_obj.object_list = timeline.load_posts(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_params': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def event_stream(request, channels):
+    if not settings.EVENTS_ENABLED:
+        # На 204 EventSource больше не переподключается.
+        return HttpResponse(status=204)
+    stream = events.EventStream(
+        channels, request.META.get('HTTP_LAST_EVENT_ID', ''))
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Иначе nginx копит поток в буфере и события приходят пачками.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@query_budget(0)
+@require_GET
+def index_events(request):
+    """Новые посты для главной страницы."""
+    return event_stream(request, [events.INDEX_CHANNEL])
+
+
+@query_budget(1)
+@require_GET
+def group_events(request, slug):
+    """Новые посты группы."""
+    group = get_object_or_404(Group, slug=slug)
+    return event_stream(request, [events.group_channel(group.pk)])
+
+
+@query_budget(3)
+@login_required
+@require_GET
+def follow_events(request):
+    """Новые посты авторов, на которых подписан пользователь."""
+    authors = request.user.follower.values_list('author_id', flat=True)
+    return event_stream(request, [events.author_channel(author_id)
+                                  for author_id in authors])
+
+
+@query_budget(1)
+@require_GET
+def post_events(request, post_id):
+    """Новые комментарии к посту."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return event_stream(request, [events.post_channel(post_id)])
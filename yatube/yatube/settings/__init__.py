@@ -0,0 +1,22 @@
+'''Настройки проекта по профилям: dev, test и prod.
+
+Профиль выбирается переменной окружения DJANGO_ENV (по умолчанию
+dev), а можно указать и модуль напрямую, например
+DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+
+'''
+import os
+
+PROFILE = os.environ.get('DJANGO_ENV', 'dev')
+
+if PROFILE == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif PROFILE == 'test':
+    from .test import *  # noqa: F401,F403
+elif PROFILE == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    from django.core.exceptions import ImproperlyConfigured
+    raise ImproperlyConfigured(
+        f'Неизвестный профиль DJANGO_ENV={PROFILE}: нужен dev, test '
+        f'или prod.')
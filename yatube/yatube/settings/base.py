@@ -0,0 +1,253 @@
+import os
+
+from .env import env, env_bool, env_int, env_list
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+SECRET_KEY = env('SECRET_KEY', '')
+
+DEBUG = env_bool('DEBUG')
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.ImageUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+ALLOWED_HOSTS = env_list('ALLOWED_HOSTS', [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+    'www.chuvashevaelena.pythonanywhere.com',
+    'chuvashevaelena.pythonanywhere.com',
+    '84.201.138.122'
+])
+
+INSTALLED_APPS = [
+    'about',
+    'core',
+    'users',
+    'posts',
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'sorl.thumbnail',
+]
+
+LOGIN_URL = 'users:login'
+LOGIN_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+                'core.context_processors.events.events',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+# Разобрать все шаблоны при запуске yatube.wsgi (включено в prod).
+TEMPLATES_PRECOMPILE = False
+
+DATABASES = {
+    'default': {
+        'ENGINE': env('DB_ENGINE', 'core.db.sqlite3'),
+        'NAME': env('DB_NAME', os.path.join(BASE_DIR, 'db.sqlite3')),
+        'USER': env('DB_USER', ''),
+        'PASSWORD': env('DB_PASSWORD', ''),
+        'HOST': env('DB_HOST', ''),
+        'PORT': env('DB_PORT', ''),
+        'CONN_MAX_AGE': env_int('CONN_MAX_AGE', 0),
+    }
+}
+
+# Выполняются для каждого нового соединения бэкенда core.db.sqlite3.
+# WAL позволяет читать во время записи, а писатель ждёт блокировку
+# до busy_timeout мс вместо ошибки «database is locked». При WAL
+# synchronous=NORMAL не теряет целостность, только последние коммиты
+# при сбое питания. cache_size в КиБ (отрицательное значение),
+# mmap_size в байтах.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'Europe/Moscow'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+STATIC_URL = '/static/'
+STATIC_ROOT = env('STATIC_ROOT', os.path.join(BASE_DIR, 'static_root'))
+
+POSTS_PER_PAGE = 10
+# Комментарии на странице поста и в каждой подгружаемой порции.
+COMMENTS_PER_PAGE = 20
+
+# Ленты подписок: сколько последних постов автора попадает в ленту
+# читателя при подписке и каким размером пачки пишутся записи ленты.
+TIMELINE_BACKFILL_POSTS = 1000
+TIMELINE_BATCH_SIZE = 500
+# Посты авторов, у которых подписчиков больше порога, не раскладываются
+# по лентам, а подмешиваются в ленту при чтении. Популярным автор
+# перестаёт, только когда подписчиков не больше нижнего порога. Ленты
+# подписчиков после перехода через порог приводит в порядок команда
+# sync_timelines (по cron); после смены самих порогов нужен
+# timeline.rebuild_all().
+FEED_CELEBRITY_FOLLOWERS = 10000
+FEED_CELEBRITY_DEMOTE_FOLLOWERS = 9000
+FEED_CELEBRITY_CACHE_SECONDS = 300
+
+# Страницы лент сбрасываются сигналами при изменении данных,
+# поэтому могут храниться в кэше долго. Просроченная страница ещё
+# PAGE_CACHE_STALE_SECONDS отдаётся, пока один процесс собирает новую.
+PAGE_CACHE_SECONDS = 60 * 60 * 4
+PAGE_CACHE_STALE_SECONDS = 60
+PAGE_CACHE_LOCK_SECONDS = 10
+# Отрисованные карточки постов; сбрасываются сигналами по меткам поста,
+# автора и группы.
+POST_CARD_CACHE_SECONDS = 60 * 60 * 24
+
+# Превышение бюджета SQL-запросов view (core.decorators.query_budget):
+# False — предупреждение в лог, True — исключение (для тестов).
+QUERY_BUDGET_STRICT = False
+
+# Варианты картинок постов для <picture>: пропорции, ширины миниатюр,
+# опции sorl-thumbnail и атрибут sizes. Каждая ширина строится во всех
+# форматах POST_IMAGE_FORMATS, которые умеет записывать Pillow;
+# последний формат — запасной для <img>.
+POST_IMAGE_VARIANTS = {
+    'card': {
+        'ratio': (960, 339),
+        'widths': (480, 720, 960),
+        'options': {'crop': '30%', 'upscale': True},
+        'sizes': '(min-width: 768px) 720px, 100vw',
+    },
+}
+POST_IMAGE_FORMATS = (
+    ('AVIF', {'quality': 60}),
+    ('WEBP', {'quality': 80}),
+    ('JPEG', {}),
+)
+THUMBNAIL_BACKEND = 'posts.thumbnails.ThumbnailBackend'
+# Метаданные миниатюр хранятся в SQLite-файле (по умолчанию
+# var/kvstore.sqlite3 вне MEDIA_ROOT) с LRU в памяти процесса.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+THUMBNAIL_KVSTORE_PATH = None
+THUMBNAIL_KVSTORE_LRU_SIZE = 10000
+# Все варианты строятся пулом из THUMBNAIL_WORKERS потоков сразу после
+# сохранения картинки; при 0 — синхронно. Страницы только читают готовые
+# миниатюры, а пока их нет, показывают оригинал и ставят их в очередь.
+# Картинку, миниатюры которой построить не удалось, страницы
+# THUMBNAIL_FAILURE_SECONDS показывают оригиналом без новой попытки.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_FAILURE_SECONDS = 60 * 60
+
+# Ограничения на картинки постов: больше POST_IMAGE_MAX_BYTES или
+# POST_IMAGE_MAX_PIXELS файл отклоняется ещё при загрузке, а картинка
+# больше POST_IMAGE_MAX_SIDE по большей стороне уменьшается до неё.
+POST_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2560
+
+# Конфигурация полнотекстового поиска PostgreSQL (русская морфология).
+# В SQLite основы слов считает posts.stemmer, а индекс хранит FTS5.
+SEARCH_POSTGRES_CONFIG = 'russian'
+
+# Админка больших таблиц: до скольких записей считать точно и сколько
+# лучших совпадений полнотекстового поиска показывать.
+ADMIN_COUNT_LIMIT = 10000
+ADMIN_SEARCH_LIMIT = 1000
+
+# Живые обновления лент (Server-Sent Events). Каждый открытый поток
+# занимает рабочий процесс или поток сервера, поэтому включайте их
+# только с асинхронными или многопоточными воркерами (например,
+# gunicorn -k gevent или gthread). Выключенные потоки отвечают 204,
+# и браузер перестаёт переподключаться.
+EVENTS_ENABLED = env_bool('EVENTS_ENABLED')
+# LocalBroker работает в пределах одного процесса, CacheBroker — через
+# общий кэш EVENTS_CACHE между любым числом процессов, опрашивая его
+# раз в EVENTS_POLL_SECONDS.
+EVENTS_BACKEND = 'posts.events.LocalBroker'
+EVENTS_CACHE = 'default'
+EVENTS_CACHE_SECONDS = 60
+EVENTS_POLL_SECONDS = 1
+EVENTS_QUEUE_SIZE = 100
+# Поток закрывается через EVENTS_STREAM_SECONDS, браузер переподключается
+# через EVENTS_RETRY_MS и по Last-Event-ID получает события, пропущенные
+# за EVENTS_CACHE_SECONDS; без событий раз в EVENTS_HEARTBEAT_SECONDS
+# отправляется пустой комментарий.
+EVENTS_STREAM_SECONDS = 30
+EVENTS_RETRY_MS = 3000
+EVENTS_HEARTBEAT_SECONDS = 15
@@ -0,0 +1,11 @@
+from .base import *  # noqa: F401,F403
+from .base import INSTALLED_APPS, MIDDLEWARE
+from .env import env_bool
+
+DEBUG = env_bool('DEBUG', True)
+
+INSTALLED_APPS = INSTALLED_APPS + ['debug_toolbar']
+MIDDLEWARE = MIDDLEWARE + ['debug_toolbar.middleware.DebugToolbarMiddleware']
+
+# Миниатюры строятся сразу, чтобы их ошибки были видны в консоли.
+THUMBNAIL_WORKERS = 0
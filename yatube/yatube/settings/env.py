@@ -0,0 +1,36 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+REQUIRED = object()
+
+
+def env(name: str, default=REQUIRED) -> str:
+    '''Значение переменной окружения; без default она обязательна.'''
+    value = os.environ.get(name)
+    if value is None:
+        if default is REQUIRED:
+            raise ImproperlyConfigured(
+                f'Задайте переменную окружения {name}.')
+        return default
+    return value
+
+
+def env_bool(name: str, default: bool = False) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return default if value is None else int(value)
+
+
+def env_list(name: str, default=()) -> list:
+    '''Список из переменной окружения через запятую.'''
+    value = os.environ.get(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
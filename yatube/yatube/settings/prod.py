@@ -0,0 +1,37 @@
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, TEMPLATES
+from .env import env, env_int
+
+DEBUG = False
+SECRET_KEY = env('SECRET_KEY')
+
+# Соединения с базой живут между запросами.
+DATABASES['default']['CONN_MAX_AGE'] = env_int('CONN_MAX_AGE', 600)
+
+# Кэш общий для всех процессов: страницы, карточки постов, счётчики
+# и события SSE видны каждому воркеру. Сессии читаются из него же.
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND',
+                       'django.core.cache.backends.memcached.MemcachedCache'),
+        'LOCATION': env('CACHE_LOCATION', '127.0.0.1:11211'),
+    }
+}
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+EVENTS_BACKEND = 'posts.events.CacheBroker'
+
+# Разобранные шаблоны хранятся в памяти процесса; при запуске
+# yatube.wsgi разбирает их все заранее (TEMPLATES_PRECOMPILE) и не
+# стартует, если какой-то шаблон не разбирается.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+TEMPLATES_PRECOMPILE = True
+
+# Имена статики с хэшем содержимого: её можно кэшировать навсегда.
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage')
@@ -0,0 +1,21 @@
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR
+from .env import env
+
+DEBUG = False
+SECRET_KEY = env('SECRET_KEY', 'test-secret-key')
+
+# Превышение бюджета SQL-запросов роняет тест, а не пишет в лог.
+QUERY_BUDGET_STRICT = True
+
+# Быстрый хэш паролей: тесты создают много пользователей.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Миниатюры строятся синхронно: фоновые потоки не должны писать в
+# MEDIA_ROOT, пока тест его удаляет.
+THUMBNAIL_WORKERS = 0
+# Метаданные миниатюр тестов не смешиваются с рабочими.
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'var', 'test-kvstore.sqlite3')